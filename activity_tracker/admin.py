@@ -2,4 +2,5 @@ from django.contrib import admin
 from .models import *
 
 admin.site.register(Activity)
-admin.site.register(Expense)
\ No newline at end of file
+admin.site.register(Expense)
+admin.site.register(Profile)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class ActivityTrackerConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'activity_tracker'
+
+    def ready(self):
+        # Render the landing page demo charts before the first request
+        if settings.WARM_DEMO_CHARTS:
+            from .utils import get_demo_charts
+            get_demo_charts()
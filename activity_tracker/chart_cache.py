@@ -0,0 +1,95 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .routers import primary_reads
+
+STATS = ('hits', 'misses')
+
+
+def _cache():
+    return caches[settings.CHART_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'chart-data-version:{user_id}'
+
+
+def _new_version():
+    # Time based so a version key evicted from the cache can never come back
+    # as a value that older chart entries were stored under
+    return time.time_ns()
+
+
+def get_data_version(user_id):
+    """Current version of a user's activity/expense data."""
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), _new_version(), timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def invalidate_user_charts(user_id):
+    """Bump the user's data version so all of their cached charts go stale."""
+    cache = _cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _new_version(), timeout=None)
+
+
+def get_or_build_chart(user, kind, build, period='all'):
+    """
+    Return the cached chart HTML for (user, kind, period, data version),
+    calling ``build()`` to render and store it on a miss. ``build()`` reads
+    from the primary: a lagging replica would store old data under the
+    new version.
+    """
+    cache = _cache()
+    key = ':'.join([
+        'chart', str(user.pk), kind, period,
+        # Period charts are relative to today, so roll over at midnight
+        timezone.localdate().isoformat(),
+        str(get_data_version(user.pk)),
+    ])
+    chart = cache.get(key)
+    if chart is not None:
+        _count('hits')
+        return chart
+    _count('misses')
+    with primary_reads():
+        chart = build()
+    cache.set(key, chart, settings.CHART_CACHE_TIMEOUT)
+    return chart
+
+
+def _stats_key(name):
+    # Bump the version if what is counted changes, so the totals start
+    # from zero instead of mixing with the old ones
+    return f'chart-cache-stats:v1:{name}'
+
+
+def _count(name):
+    # Kept in the chart cache so every worker adds to the same totals;
+    # incr() is atomic on Redis and Memcached
+    cache = _cache()
+    try:
+        cache.incr(_stats_key(name))
+    except ValueError:
+        # First count, or the key was evicted; add() loses to a concurrent one
+        if not cache.add(_stats_key(name), 1, timeout=None):
+            cache.incr(_stats_key(name))
+
+
+def chart_cache_stats():
+    """Hit/miss counters of all processes sharing the chart cache."""
+    counts = _cache().get_many([_stats_key(name) for name in STATS])
+    return {name: counts.get(_stats_key(name), 0) for name in STATS}
+
+
+def reset_chart_cache_stats():
+    _cache().delete_many([_stats_key(name) for name in STATS])
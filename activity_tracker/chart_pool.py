@@ -0,0 +1,112 @@
+"""
+Bounded thread pool, shared by all requests, that builds a page's charts
+concurrently. Each chart gets a deadline; late or failing charts are
+replaced by a fallback, and every build is timed for Server-Timing.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Load plotly before the workers could all import it at once
+            from .utils import warm_up_charting
+            warm_up_charting()
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.DASHBOARD_CHART_WORKERS,
+                thread_name_prefix='dashboard-chart',
+            )
+    return _executor
+
+
+def _timed(build):
+    started = time.perf_counter()
+    return build(), time.perf_counter() - started
+
+
+def _run_in_worker(build):
+    try:
+        return _timed(build)
+    finally:
+        # Workers outlive requests, so close their connection once it is past
+        # CONN_MAX_AGE or broken, like request_finished does
+        close_old_connections()
+
+
+def submit_charts(builders):
+    """
+    Start ``{name: build}`` callables and return ``{name: (future, deadline)}``.
+    Builds see the request's time zone and database routing; with
+    DASHBOARD_CHART_WORKERS = 0 they run right here instead.
+    """
+    deadline = time.monotonic() + settings.DASHBOARD_CHART_TIMEOUT
+    pending = {}
+    for name, build in builders.items():
+        if settings.DASHBOARD_CHART_WORKERS:
+            future = get_executor().submit(copy_context().run, _run_in_worker, build)
+        else:
+            future = Future()
+            try:
+                future.set_result(_timed(build))
+            except Exception as e:
+                future.set_exception(e)
+        pending[name] = (future, deadline)
+    return pending
+
+
+def collect_charts(pending, fallbacks):
+    """
+    Wait for each chart until its deadline and return ``(charts, timings)``,
+    using ``fallbacks[name]`` for charts that timed out or failed. Timings
+    are ``{name: (seconds, status)}``.
+    """
+    charts, timings = {}, {}
+    for name, (future, deadline) in pending.items():
+        started = deadline - settings.DASHBOARD_CHART_TIMEOUT
+        try:
+            charts[name], seconds = future.result(timeout=max(deadline - time.monotonic(), 0))
+            timings[name] = (seconds, 'ok')
+            continue
+        except TimeoutError:
+            # Not started yet: drop it; running: let it finish into the cache
+            future.cancel()
+            status = 'timeout'
+            logger.warning("Chart %s timed out after %ss", name, settings.DASHBOARD_CHART_TIMEOUT)
+        except Exception:
+            status = 'error'
+            logger.exception("Chart %s failed", name)
+        charts[name] = fallbacks[name]
+        timings[name] = (time.monotonic() - started, status)
+    return charts, timings
+
+
+async def acollect_charts(pending, fallbacks):
+    """Async version of ``collect_charts``; waits without blocking the event loop."""
+    for future, deadline in pending.values():
+        waiter = asyncio.wrap_future(future)
+        # A chart finishing after its deadline must not log an unretrieved error
+        waiter.add_done_callback(lambda waiter: waiter.cancelled() or waiter.exception())
+        await asyncio.wait([waiter], timeout=max(deadline - time.monotonic(), 0))
+    return collect_charts(pending, fallbacks)
+
+
+def server_timing(timings):
+    """Server-Timing header value, e.g. ``chart-daily;dur=12.5;desc="ok"``."""
+    return ', '.join(
+        f'chart-{name.replace("_", "-")};dur={seconds * 1000:.1f};desc="{status}"'
+        for name, (seconds, status) in timings.items()
+    )
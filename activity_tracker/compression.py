@@ -0,0 +1,103 @@
+"""
+Response compression negotiated from Accept-Encoding: Brotli where the
+client takes it and the page holds no CSRF token, gzip otherwise.
+
+Compressed pages that mix a secret with request-controlled text leak the
+secret to BREACH, so gzip output carries a random-length filename in its
+header (Heal the BREACH, as in Django's GZipMiddleware), making the
+response length unreliable to an attacker. Brotli has no such field, so it
+is only used for responses that didn't render a CSRF token.
+"""
+import gzip
+import secrets
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import get_random_string
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing; images, archives and gzip exports aren't
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'image/svg+xml',
+)
+
+
+def accepted_encodings(header):
+    """Content codings listed in an Accept-Encoding header, minus any with q=0."""
+    accepted = set()
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def gzip_compress(data, level, max_random_bytes=0):
+    """Gzip ``data``, padding the header with up to ``max_random_bytes`` random bytes."""
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    if not max_random_bytes:
+        return compressed
+    header = bytearray(compressed[:10])
+    header[3] = gzip.FNAME
+    filename = get_random_string(secrets.randbelow(max_random_bytes) + 1).encode()
+    return bytes(header) + filename + b'\x00' + compressed[10:]
+
+
+def brotli_compress(data, quality):
+    return brotli.compress(data, mode=brotli.MODE_TEXT, quality=quality)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses of at least COMPRESSION_MIN_SIZE bytes with Brotli
+    (COMPRESSION_BROTLI_QUALITY) or gzip (COMPRESSION_GZIP_LEVEL). Streaming
+    responses are left alone: exports offer their own gzip option.
+    """
+
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header('Content-Encoding')
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE
+                or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        # get_token() flags the request whenever a CSRF token was rendered
+        has_csrf_token = request.META.get('CSRF_COOKIE_NEEDS_UPDATE', False)
+        if brotli and settings.COMPRESSION_BROTLI and 'br' in accepted and not has_csrf_token:
+            encoding = 'br'
+            compressed = brotli_compress(response.content, settings.COMPRESSION_BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = gzip_compress(
+                response.content, settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_RANDOM_BYTES)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # The encoded body is not byte-identical any more (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
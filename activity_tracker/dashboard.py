@@ -0,0 +1,153 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db.models import DurationField, Q, Sum
+
+from .models import Activity, ActivityRollup, ExpenseRollup
+from .pagination import PAGE_SIZE, akeyset_page
+from .utils import period_bounds, period_dates
+
+
+@dataclass(frozen=True)
+class DashboardData:
+    """Everything the dashboard page shows apart from the daily chart."""
+    today_activities: list
+    # Year to date, one dict per activity type / expense category
+    activity_tag_stats: list
+    expenses_tag_stats: list
+    # Column-wise chart data, see utils.columns()
+    activities_by_type: dict
+    expenses_by_category: dict
+
+    @property
+    def has_expenses(self):
+        return bool(self.expenses_tag_stats)
+
+
+async def alist(queryset):
+    """Evaluate a queryset with the async ORM."""
+    return [row async for row in queryset]
+
+
+def _activity_stats_query(user, period):
+    year_start, year_end = period_dates('year')
+    period_start, period_end = period_dates(period)
+    in_year = Q(day__gte=year_start, day__lt=year_end)
+    in_period = Q(day__gte=period_start, day__lt=period_end)
+    return ActivityRollup.objects.filter(
+        user=user,
+        day__gte=min(year_start, period_start),
+        day__lt=max(year_end, period_end),
+    ).values('activity_type').annotate(
+        year_count=Sum('activity_count', filter=in_year),
+        year_duration=Sum('total_duration', filter=in_year, output_field=DurationField()),
+        period_count=Sum('activity_count', filter=in_period),
+    ).order_by('activity_type')
+
+
+def _fold_activity_stats(rows):
+    tag_stats = []
+    by_type = {'activity_type': [], 'activity_count': []}
+    for row in rows:
+        if row['year_count']:
+            tag_stats.append({
+                'activity_type': row['activity_type'],
+                'activity_count': row['year_count'],
+                'total_duration': row['year_duration'] or timedelta(0),
+            })
+        if row['period_count']:
+            by_type['activity_type'].append(row['activity_type'])
+            by_type['activity_count'].append(row['period_count'])
+    return tag_stats, by_type
+
+
+def _expense_stats_query(user):
+    year_start, year_end = period_dates('year')
+    in_year = Q(day__gte=year_start, day__lt=year_end)
+    return ExpenseRollup.objects.filter(user=user).values('category').annotate(
+        year_amount=Sum('total_amount', filter=in_year),
+        year_count=Sum('expense_count', filter=in_year),
+        all_time_amount=Sum('total_amount'),
+    ).order_by('category')
+
+
+def _fold_expense_stats(rows):
+    tag_stats = []
+    by_category = {'category': [], 'total_amount': []}
+    for row in rows:
+        if row['year_count']:
+            tag_stats.append({
+                'category': row['category'],
+                'total_amount': row['year_amount'],
+                'expenses_count': row['year_count'],
+            })
+        by_category['category'].append(row['category'])
+        by_category['total_amount'].append(row['all_time_amount'])
+    return tag_stats, by_category
+
+
+def today_activities(user):
+    """The user's activities starting today, newest first."""
+    day_start, day_end = period_bounds('day')
+    return Activity.objects.filter(
+        user=user,
+        start_time__gte=day_start,
+        start_time__lt=day_end,
+    ).order_by('-start_time')
+
+
+async def aget_dashboard_data(user, period='year'):
+    """
+    Load the dashboard in three queries: today's activities plus one
+    aggregate statement each over the activity and expense rollups.
+
+    They run one after another. The async ORM sends every query through
+    the same thread-sensitive executor and database connection, so
+    gather() doesn't overlap them. It only keeps the awaiting in one place.
+    """
+    activities, activity_rows, expense_rows = await asyncio.gather(
+        alist(today_activities(user)),
+        alist(_activity_stats_query(user, period)),
+        alist(_expense_stats_query(user)),
+    )
+    activity_tag_stats, activities_by_type = _fold_activity_stats(activity_rows)
+    expenses_tag_stats, expenses_by_category = _fold_expense_stats(expense_rows)
+    return DashboardData(
+        today_activities=activities,
+        activity_tag_stats=activity_tag_stats,
+        expenses_tag_stats=expenses_tag_stats,
+        activities_by_type=activities_by_type,
+        expenses_by_category=expenses_by_category,
+    )
+
+
+def period_type_totals(user, period):
+    """Activity count and duration per type in the current ``period``, from the rollups."""
+    start, end = period_dates(period)
+    return ActivityRollup.objects.filter(
+        user=user,
+        day__gte=start,
+        day__lt=end,
+    ).values('activity_type').annotate(
+        total_duration=Sum('total_duration', output_field=DurationField()),
+        activity_count=Sum('activity_count'),
+    ).order_by('activity_type')
+
+
+# Columns the activity list tables render
+ACTIVITY_LIST_FIELDS = ('id', 'name', 'activity_type', 'start_time', 'end_time', 'duration')
+
+
+def _activity_list_query(user, period):
+    start, end = period_bounds(period)
+    return Activity.objects.filter(
+        user=user,
+        start_time__gte=start,
+        start_time__lt=end,
+    ).only(*ACTIVITY_LIST_FIELDS)
+
+
+async def aactivity_list_page(user, period, cursor=None, page_size=PAGE_SIZE):
+    """One keyset page of the user's activities in the current ``period``, newest first."""
+    return await akeyset_page(_activity_list_query(user, period), ('-start_time', '-id'), cursor, page_size)
@@ -0,0 +1,90 @@
+"""
+Query engine behind the Expenses page: filtering, server-side sorting with
+keyset pagination, and category/month totals of the filtered set.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from .models import Expense
+from .pagination import PAGE_SIZE, keyset_page
+
+# Sort option -> keyset ordering; id breaks ties so every row has one place
+SORTS = {
+    '-date': ('-date', '-id'),
+    'date': ('date', 'id'),
+    '-amount': ('-amount', '-id'),
+    'amount': ('amount', 'id'),
+}
+
+LIST_FIELDS = ('id', 'date', 'category', 'amount', 'description', 'activity', 'activity__name')
+
+
+@dataclass(frozen=True)
+class ExpenseTotals:
+    total: Decimal
+    count: int
+    # [{'category': ..., 'total': ..., 'count': ...}], largest first
+    by_category: list
+    # [{'year': ..., 'month': ..., 'total': ..., 'count': ...}], newest first
+    by_month: list
+
+
+def filter_expenses(user, category=None, start=None, end=None, linked=None, activity=None,
+                    min_amount=None, max_amount=None):
+    """The user's expenses matching every given filter; ``end`` is inclusive."""
+    expenses = Expense.objects.filter(user=user)
+    if category:
+        expenses = expenses.filter(category__in=category)
+    if start:
+        expenses = expenses.filter(date__gte=start)
+    if end:
+        expenses = expenses.filter(date__lte=end)
+    if linked == 'linked':
+        expenses = expenses.filter(activity__isnull=False)
+    elif linked == 'unlinked':
+        expenses = expenses.filter(activity__isnull=True)
+    if activity:
+        expenses = expenses.filter(activity_id=activity)
+    if min_amount is not None:
+        expenses = expenses.filter(amount__gte=min_amount)
+    if max_amount is not None:
+        expenses = expenses.filter(amount__lte=max_amount)
+    return expenses
+
+
+def expense_page(expenses, sort='-date', cursor=None, page_size=PAGE_SIZE):
+    """One keyset page of ``expenses`` with their linked activity joined in."""
+    expenses = expenses.select_related('activity').only(*LIST_FIELDS)
+    return keyset_page(expenses, SORTS[sort], cursor, page_size)
+
+
+def expense_totals(expenses):
+    """Overall, per-category and per-month totals from one GROUP BY query."""
+    rows = expenses.order_by().values('category', 'year', 'month').annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    )
+    categories = defaultdict(lambda: {'total': Decimal(0), 'count': 0})
+    months = defaultdict(lambda: {'total': Decimal(0), 'count': 0})
+    for row in rows:
+        for bucket in (categories[row['category']], months[row['year'], row['month']]):
+            bucket['total'] += row['total']
+            bucket['count'] += row['count']
+    labels = dict(Expense.TAGS)
+    by_category = sorted(
+        ({'category': labels.get(category, category), **totals} for category, totals in categories.items()),
+        key=lambda item: item['total'], reverse=True,
+    )
+    by_month = [
+        {'year': year, 'month': month, **months[year, month]}
+        for year, month in sorted(months, reverse=True)
+    ]
+    return ExpenseTotals(
+        total=sum((item['total'] for item in by_category), Decimal(0)),
+        count=sum(item['count'] for item in by_category),
+        by_category=by_category,
+        by_month=by_month,
+    )
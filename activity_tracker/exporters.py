@@ -0,0 +1,149 @@
+"""
+Streaming CSV / NDJSON export of a user's activities and expenses. Activity
+exports use the column names ``importers`` reads back.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.duration import duration_string
+
+from .models import Activity, Expense
+
+FORMATS = ('csv', 'ndjson')
+CHUNK_SIZE = 2000
+
+ACTIVITY_FIELDS = ('id', 'name', 'activity_type', 'start_time', 'end_time', 'duration', 'description')
+EXPENSE_FIELDS = ('id', 'date', 'category', 'amount', 'description', 'activity_id')
+
+
+def activity_rows(user, start=None, end=None, types=None):
+    """Activities starting on local dates ``start`` to ``end`` inclusive, oldest first."""
+    activities = Activity.objects.filter(user=user)
+    if start:
+        activities = activities.filter(start_time__gte=_day_start(start))
+    if end:
+        activities = activities.filter(start_time__lt=_day_start(end + timedelta(days=1)))
+    if types:
+        activities = activities.filter(activity_type__in=types)
+    return activities.order_by('start_time', 'id').values(*ACTIVITY_FIELDS)
+
+
+def expense_rows(user, start=None, end=None, types=None):
+    """Expenses dated ``start`` to ``end`` inclusive, oldest first."""
+    expenses = Expense.objects.filter(user=user)
+    if start:
+        expenses = expenses.filter(date__gte=start)
+    if end:
+        expenses = expenses.filter(date__lte=end)
+    if types:
+        expenses = expenses.filter(category__in=types)
+    return expenses.order_by('date', 'id').values(*EXPENSE_FIELDS)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _plain(value, tz):
+    if isinstance(value, datetime):
+        return timezone.localtime(value, tz).isoformat()
+    if isinstance(value, timedelta):
+        return duration_string(value)
+    return value
+
+
+def _csv(lines):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(lines)
+    return buffer.getvalue()
+
+
+def _encode(rows, fields, fmt, tz):
+    if fmt == 'csv':
+        return _csv(['' if row[f] is None else _plain(row[f], tz) for f in fields] for row in rows)
+    return ''.join(
+        json.dumps({f: _plain(row[f], tz) for f in fields}, cls=DjangoJSONEncoder) + '\n'
+        for row in rows
+    )
+
+
+class _Encoder:
+    """Turns batches of rows into bytes of the export, gzipped if asked."""
+
+    def __init__(self, fields, fmt, compress):
+        self.fields = fields
+        self.fmt = fmt
+        # Iterators run after the view returns, when the request's time zone
+        # is no longer active, so resolve it now
+        self.tz = timezone.get_current_timezone()
+        self.compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+
+    def _bytes(self, text):
+        data = text.encode()
+        return self.compressor.compress(data) if self.compressor else data
+
+    def header(self):
+        return self._bytes(_csv([self.fields]) if self.fmt == 'csv' else '')
+
+    def rows(self, batch):
+        return self._bytes(_encode(batch, self.fields, self.fmt, self.tz))
+
+    def finish(self):
+        return self.compressor.flush() if self.compressor else b''
+
+
+def stream_export(rows, fields, fmt='csv', compress=False, chunk_size=None):
+    """
+    Return an iterator of the export as bytes, ``chunk_size`` rows at a time,
+    reading the queryset through a server-side cursor so memory stays flat.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    encoder = _Encoder(fields, fmt, compress)
+    # The database the router picks must be resolved now too
+    rows = rows.using(rows.db)
+
+    def encoded():
+        yield encoder.header()
+        batch = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield encoder.rows(batch)
+                batch = []
+        if batch:
+            yield encoder.rows(batch)
+        yield encoder.finish()
+
+    return (data for data in encoded() if data)
+
+
+def astream_export(rows, fields, fmt='csv', compress=False, chunk_size=None):
+    """
+    stream_export() as an async iterator, for responses served over ASGI,
+    where Django reads a sync iterator into a list before sending any of it.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    encoder = _Encoder(fields, fmt, compress)
+    rows = rows.using(rows.db)
+
+    async def encoded():
+        if data := encoder.header():
+            yield data
+        batch = []
+        async for row in rows.aiterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) == chunk_size:
+                if data := encoder.rows(batch):
+                    yield data
+                batch = []
+        if batch and (data := encoder.rows(batch)):
+            yield data
+        if data := encoder.finish():
+            yield data
+
+    return encoded()
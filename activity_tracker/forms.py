@@ -56,4 +56,61 @@ class ExpenseForm(forms.ModelForm):
         widgets = {
             'amount': forms.NumberInput(attrs={'step': '0.01'}),
         }
-    
\ No newline at end of file
+    
+
+class ExportForm(forms.Form):
+    """Query string filters of the activity/expense export endpoints."""
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    type = forms.MultipleChoiceField(required=False)
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], required=False)
+    gzip = forms.BooleanField(required=False)
+
+    def __init__(self, *args, tags=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['type'].choices = tags
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and end < start:
+            raise forms.ValidationError("End date must not be before the start date.")
+        cleaned_data['format'] = cleaned_data.get('format') or 'csv'
+        return cleaned_data
+
+
+class ExpenseFilterForm(forms.Form):
+    """Filters and sort order of the Expenses page, read from the query string."""
+    category = forms.MultipleChoiceField(
+        choices=Expense.TAGS, required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-select'}),
+    )
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    linked = forms.ChoiceField(
+        choices=[('', 'Any'), ('linked', 'Linked to an activity'), ('unlinked', 'Not linked')],
+        required=False, label="Activity",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    activity = forms.IntegerField(required=False, widget=forms.HiddenInput)
+    min_amount = forms.DecimalField(required=False, min_value=0, decimal_places=2,
+                                    widget=forms.NumberInput(attrs={'step': '0.01', 'class': 'form-control'}))
+    max_amount = forms.DecimalField(required=False, min_value=0, decimal_places=2,
+                                    widget=forms.NumberInput(attrs={'step': '0.01', 'class': 'form-control'}))
+    sort = forms.ChoiceField(
+        choices=[('-date', 'Newest first'), ('date', 'Oldest first'),
+                 ('-amount', 'Largest first'), ('amount', 'Smallest first')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and end < start:
+            raise forms.ValidationError("End date must not be before the start date.")
+        low, high = cleaned_data.get('min_amount'), cleaned_data.get('max_amount')
+        if low is not None and high is not None and high < low:
+            raise forms.ValidationError("Maximum amount must not be below the minimum.")
+        cleaned_data['sort'] = cleaned_data.get('sort') or '-date'
+        return cleaned_data
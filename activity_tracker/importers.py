@@ -0,0 +1,232 @@
+"""
+Streaming import of activities, each optionally with one expense, from CSV
+or JSON lines.
+
+Columns / keys: name, activity_type, start_time, end_time, duration,
+description, expense_amount, expense_category, expense_date,
+expense_description. Only name and start_time are required; naive times
+are read in the user's time zone.
+"""
+import codecs
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_duration
+
+from .models import Activity, Expense, Profile
+
+FORMATS = ('csv', 'jsonl')
+
+# Only the first errors are kept for the report; all of them are counted
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    activities: int = 0
+    expenses: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'activities': self.activities,
+            'expenses': self.expenses,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def format_for(filename):
+    """Guess the import format from a file name, defaulting to CSV."""
+    return 'jsonl' if filename.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def decode_lines(binary, encoding='utf-8-sig'):
+    """
+    Decode a binary file one line at a time, so a decoding error is raised
+    at its own line rather than somewhere in an 8 KB chunk. The default
+    drops the byte order mark Excel puts at the start of UTF-8 CSVs.
+    """
+    return codecs.iterdecode(binary, encoding)
+
+
+def read_rows(stream, fmt):
+    """
+    Yield ``(line_number, row)`` from an iterable of text lines one record
+    at a time; ``row`` is an error message instead of a dict for unreadable
+    records. A line that can't be decoded or parsed as CSV ends the file.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        # line_num counts the lines of the records read so far
+        except UnicodeDecodeError as e:
+            yield reader.line_num + 1, f"Invalid text encoding: {e.reason}"
+        except csv.Error as e:
+            yield reader.line_num + 1, f"Invalid CSV: {e}"
+    elif fmt == 'jsonl':
+        number = 0
+        try:
+            for number, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield number, f"Invalid JSON: {e}"
+                    continue
+                yield number, row if isinstance(row, dict) else "Expected a JSON object"
+        except UnicodeDecodeError as e:
+            yield number + 1, f"Invalid text encoding: {e.reason}"
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+
+def _field(model, name):
+    return model._meta.get_field(name)
+
+
+def _value(row, key):
+    value = row.get(key)
+    if isinstance(value, str):
+        value = value.strip()
+    return value if value not in (None, '') else None
+
+
+def _datetime(row, key):
+    value = _value(row, key)
+    if value is None:
+        return None
+    value = _field(Activity, key).to_python(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def _choice(row, key, model, name):
+    value = _value(row, key) or _field(model, name).default
+    if value not in dict(model.TAGS):
+        raise ValidationError(f"{key}: {value!r} is not one of {', '.join(dict(model.TAGS))}")
+    return value
+
+
+def build_objects(user, row):
+    """
+    Validate one row and return the unsaved ``(activity, expense or None)``,
+    without any database queries.
+    """
+    name = _value(row, 'name')
+    if not name:
+        raise ValidationError("name is required")
+    _field(Activity, 'name').run_validators(name)
+    start_time = _datetime(row, 'start_time')
+    if start_time is None:
+        raise ValidationError("start_time is required")
+    end_time = _datetime(row, 'end_time')
+    duration = _value(row, 'duration')
+    if duration is not None:
+        try:
+            duration = (timedelta(seconds=float(duration)) if isinstance(duration, (int, float))
+                        else parse_duration(duration))
+        except OverflowError:
+            raise ValidationError("duration is out of range")
+        if duration is None:
+            raise ValidationError("duration is not a valid duration")
+
+    activity = Activity(
+        user=user,
+        name=name,
+        description=_value(row, 'description') or '',
+        start_time=start_time,
+        end_time=end_time,
+        logged_duration=duration,
+        activity_type=_choice(row, 'activity_type', Activity, 'activity_type'),
+    )
+    activity.validate_once()
+
+    expense = None
+    amount = _value(row, 'expense_amount')
+    if amount is not None:
+        amount = _field(Expense, 'amount').to_python(amount)
+        _field(Expense, 'amount').run_validators(amount)
+        expense_date = _value(row, 'expense_date')
+        expense = Expense(
+            user=user,
+            amount=amount,
+            category=_choice(row, 'expense_category', Expense, 'category'),
+            date=(_field(Expense, 'date').to_python(expense_date) if expense_date
+                  else timezone.localdate(start_time)),
+            description=_value(row, 'expense_description') or '',
+        )
+        expense.validate_once()
+    return activity, expense
+
+
+def _insert(pairs):
+    # The bulk methods derive fields and apply the rollup changes per batch;
+    # rows already validated above are not checked again
+    activities = Activity.objects.bulk_create([activity for activity, _ in pairs])
+    expenses = []
+    for activity, expense in pairs:
+        if expense is not None:
+            # bulk_create set the primary keys on the activities
+            expense.activity = activity
+            expenses.append(expense)
+    Expense.objects.bulk_create(expenses)
+    return len(activities), len(expenses)
+
+
+def import_activities(user, stream, fmt='csv', batch_size=1000):
+    """
+    Import ``stream`` for ``user`` in transactions of ``batch_size`` rows.
+    Invalid rows are reported and skipped; valid ones are kept, including
+    those before an unreadable line that stops the import.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    rows = read_rows(stream, fmt)
+    # Naive times in the file are in the user's own time zone
+    with timezone.override(Profile.timezones_for([user.pk])[user.pk]):
+        while batch := list(islice(rows, batch_size)):
+            pairs = []
+            for line, row in batch:
+                result.rows += 1
+                if isinstance(row, str):
+                    result.add_error(line, row)
+                    continue
+                try:
+                    pairs.append(build_objects(user, row))
+                except (ValidationError, ValueError, TypeError) as e:
+                    message = '; '.join(e.messages) if isinstance(e, ValidationError) else str(e)
+                    result.add_error(line, message)
+            if pairs:
+                with transaction.atomic():
+                    activities, expenses = _insert(pairs)
+                result.activities += activities
+                result.expenses += expenses
+    result.seconds = time.perf_counter() - started
+    return result
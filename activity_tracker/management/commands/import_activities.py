@@ -0,0 +1,39 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from activity_tracker.importers import FORMATS, decode_lines, format_for, import_activities
+
+
+class Command(BaseCommand):
+    help = "Import activities (and their expenses) for one user from CSV or JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for standard input.")
+        parser.add_argument('--user', required=True, help="Username to import for.")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+        path = options['path']
+        fmt = options['format'] or format_for(path)
+        if path == '-':
+            result = import_activities(user, decode_lines(sys.stdin.buffer), fmt, options['batch_size'])
+        else:
+            with open(path, 'rb') as stream:
+                result = import_activities(user, decode_lines(stream), fmt, options['batch_size'])
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more errors")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.activities} activities and {result.expenses} expenses "
+            f"from {result.rows} rows in {result.seconds:.1f}s "
+            f"({result.rows_per_second:.0f} rows/s, {result.error_count} errors)."
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from activity_tracker.models import Activity, PLACEHOLDER_ACTIVITY
+
+
+class Command(BaseCommand):
+    help = "Delete the 'Hello' placeholder activities the dashboard used to insert."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report how many rows would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        placeholders = Activity.objects.filter(**PLACEHOLDER_ACTIVITY)
+        if options['dry_run']:
+            self.stdout.write(f"{placeholders.count()} placeholder activities would be deleted.")
+            return
+
+        deleted = 0
+        while True:
+            batch = list(placeholders.values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            # One short transaction per batch so the table is never locked for
+            # the whole purge; delete() keeps the rollups and charts in step
+            with transaction.atomic():
+                Activity.objects.filter(pk__in=batch).delete()
+            deleted += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} placeholder activities."))
@@ -0,0 +1,26 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from activity_tracker.models import ActivityRollup, ExpenseRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily activity and expense rollup tables from raw rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames',
+            help="Only rebuild rollups for this username (repeatable).",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        ActivityRollup.rebuild(users, batch_size=options['batch_size'])
+        ExpenseRollup.rebuild(users, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {ActivityRollup.objects.count()} activity and "
+            f"{ExpenseRollup.objects.count()} expense rollup rows."
+        ))
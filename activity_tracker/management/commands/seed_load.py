@@ -0,0 +1,149 @@
+import math
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from activity_tracker.models import Activity, Expense
+
+# type -> (weekday weight, weekend weight, usual start hour, median minutes, names)
+ACTIVITY_PROFILES = {
+    'work': (6, 0.3, 9, 150, ['Deep work', 'Meetings', 'Code review', 'Planning', 'Email']),
+    'exercise': (1.5, 2.5, 7, 45, ['Run', 'Gym', 'Cycling', 'Swim', 'Yoga']),
+    'learning': (1.5, 1.5, 19, 60, ['Reading', 'Online course', 'Language practice']),
+    'hobby': (1, 3, 18, 90, ['Guitar', 'Painting', 'Gardening', 'Board games']),
+    'personal': (1.5, 2, 12, 40, ['Cooking', 'Cleaning', 'Doctor', 'Family call']),
+    'shopping': (0.5, 2, 16, 35, ['Groceries', 'Clothes', 'Hardware store']),
+    'other': (0.5, 0.7, 14, 30, ['Errands', 'Admin']),
+}
+
+# Chance that an activity of this type comes with a linked expense
+LINKED_EXPENSE = {
+    'shopping': ('shopping', 0.9), 'hobby': ('entertainment', 0.3), 'exercise': ('other', 0.1),
+    'learning': ('other', 0.15), 'work': ('transport', 0.2), 'personal': ('food', 0.25),
+}
+
+# category -> (weight of stand-alone expenses, median amount)
+EXPENSE_PROFILES = {
+    'food': (6, 14), 'transport': (3, 8), 'entertainment': (1.5, 25),
+    'shopping': (1.5, 40), 'other': (1, 20),
+}
+
+
+def _poisson(rng, mean):
+    # Knuth's method; fine for the small per-day means used here
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def _amount(rng, median):
+    return Decimal(max(rng.lognormvariate(math.log(median), 0.6), 0.5)).quantize(Decimal('0.01'))
+
+
+def generate_day(rng, user, day, activities_per_day, expenses_per_day, tz):
+    """Unsaved ``(activity, expense or None)`` pairs and stand-alone expenses of one day."""
+    weekend = day.weekday() >= 5
+    types = list(ACTIVITY_PROFILES)
+    weights = [profile[1 if weekend else 0] for profile in ACTIVITY_PROFILES.values()]
+    pairs = []
+    for activity_type in rng.choices(types, weights, k=_poisson(rng, activities_per_day)):
+        _, _, hour, minutes, names = ACTIVITY_PROFILES[activity_type]
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()), tz) + timedelta(
+            hours=min(max(rng.gauss(hour, 2), 5), 22), minutes=rng.randrange(60))
+        length = timedelta(minutes=round(min(max(rng.lognormvariate(math.log(minutes), 0.5), 5), 480)))
+        activity = Activity(user=user, name=rng.choice(names), activity_type=activity_type, start_time=start)
+        # Most activities are timed; some only have a logged duration
+        if rng.random() < 0.9:
+            activity.end_time = start + length
+        else:
+            activity.logged_duration = length
+        expense = None
+        category, chance = LINKED_EXPENSE.get(activity_type, (None, 0))
+        if rng.random() < chance:
+            expense = Expense(user=user, date=day, category=category,
+                              amount=_amount(rng, EXPENSE_PROFILES[category][1]))
+        pairs.append((activity, expense))
+
+    categories = list(EXPENSE_PROFILES)
+    weights = [weight for weight, _ in EXPENSE_PROFILES.values()]
+    expenses = [
+        Expense(user=user, date=day, category=category, amount=_amount(rng, EXPENSE_PROFILES[category][1]))
+        for category in rng.choices(categories, weights, k=_poisson(rng, expenses_per_day))
+    ]
+    if day.day == 1:
+        # Monthly bills
+        expenses += [Expense(user=user, date=day, category='bills', description=name,
+                             amount=_amount(rng, median))
+                     for name, median in (('Rent', 900), ('Utilities', 120), ('Phone', 30))]
+    return pairs, expenses
+
+
+class Command(BaseCommand):
+    help = "Create load-test users with years of realistic activities and expenses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--years', type=float, default=1, help="History per user, ending today.")
+        parser.add_argument('--activities-per-day', type=float, default=4)
+        parser.add_argument('--expenses-per-day', type=float, default=1.5,
+                            help="Expenses not linked to an activity.")
+        parser.add_argument('--prefix', default='load', help="Usernames are <prefix>0, <prefix>1, ...")
+        parser.add_argument('--seed', type=int, help="Random seed, for repeatable data.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help="Delete the users a previous run created with this prefix (<prefix><number>) first.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        if options['clear']:
+            # Only the generated names, not real accounts sharing the prefix
+            generated = User.objects.filter(username__regex=rf'^{re.escape(prefix)}[0-9]+$')
+            deleted, _ = generated.delete()
+            self.stdout.write(f"Deleted {deleted} existing rows for {prefix}<number> users.")
+        users = User.objects.bulk_create(
+            User(username=f'{prefix}{i}', password='!') for i in range(options['users'])
+        )
+
+        tz = timezone.get_current_timezone()
+        today = timezone.localdate()
+        days = [today - timedelta(days=n) for n in range(round(options['years'] * 365), -1, -1)]
+        activity_count = expense_count = 0
+        for user in users:
+            pairs, expenses = [], []
+            for day in days:
+                day_pairs, day_expenses = generate_day(
+                    rng, user, day, options['activities_per_day'], options['expenses_per_day'], tz)
+                pairs += day_pairs
+                expenses += day_expenses
+                if len(pairs) >= options['batch_size'] or day == days[-1]:
+                    activity_count += len(pairs)
+                    expense_count += self._insert(pairs, expenses, options['batch_size'])
+                    pairs, expenses = [], []
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users, {activity_count} activities and {expense_count} expenses "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def _insert(self, pairs, expenses, batch_size):
+        # The bulk methods fill in derived values and keep the rollups current
+        with transaction.atomic():
+            Activity.objects.bulk_create([activity for activity, _ in pairs], batch_size)
+            for activity, expense in pairs:
+                if expense is not None:
+                    expense.activity = activity
+                    expenses.append(expense)
+            Expense.objects.bulk_create(expenses, batch_size)
+        return len(expenses)
@@ -0,0 +1,52 @@
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils import timezone
+
+from .models import Profile
+
+
+async def _resolved(user):
+    return user
+
+
+class UserTimezoneMiddleware:
+    """Activate the signed-in user's time zone for the rest of the request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        user = request.user
+        if user.is_authenticated:
+            timezone.activate(Profile.timezone_for(user.pk))
+        else:
+            timezone.deactivate()
+        # Async views ask for the user again through request.auser(), which
+        # Django caches separately; hand them the one loaded here
+        request.auser = partial(_resolved, user)
+        try:
+            return self.get_response(request)
+        finally:
+            timezone.deactivate()
+
+    async def __acall__(self, request):
+        # Resolve the lazy user once here, so sync code later in the request
+        # (decorators, templates) doesn't query from the event loop
+        request.user = user = await request.auser()
+        if user.is_authenticated:
+            timezone.activate(await sync_to_async(Profile.timezone_for)(user.pk))
+        else:
+            timezone.deactivate()
+        try:
+            return await self.get_response(request)
+        finally:
+            timezone.deactivate()
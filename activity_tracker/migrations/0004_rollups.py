@@ -0,0 +1,76 @@
+# Generated by Django 5.1.10 on 2026-10-18 18:03
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    Activity = apps.get_model('activity_tracker', 'Activity')
+    Expense = apps.get_model('activity_tracker', 'Expense')
+    ActivityRollup = apps.get_model('activity_tracker', 'ActivityRollup')
+    ExpenseRollup = apps.get_model('activity_tracker', 'ExpenseRollup')
+
+    activity_totals = Activity.objects.annotate(day=TruncDate('start_time')) \
+        .values('user_id', 'day', 'activity_type') \
+        .annotate(
+            activity_count=Count('id'),
+            total_duration=Coalesce(Sum('duration'), Value(datetime.timedelta(0))),
+        ).order_by()
+    ActivityRollup.objects.bulk_create(
+        (ActivityRollup(**row) for row in activity_totals.iterator(chunk_size=1000)),
+        batch_size=1000,
+    )
+
+    expense_totals = Expense.objects.values('user_id', 'category', day=F('date')) \
+        .annotate(
+            expense_count=Count('id'),
+            total_amount=Sum('amount'),
+        ).order_by()
+    ExpenseRollup.objects.bulk_create(
+        (ExpenseRollup(**row) for row in expense_totals.iterator(chunk_size=1000)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity_tracker', '0003_expense'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('activity_type', models.CharField(max_length=20)),
+                ('activity_count', models.IntegerField(default=0)),
+                ('total_duration', models.DurationField(default=datetime.timedelta(0))),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'activity_type'), name='unique_activity_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=20)),
+                ('expense_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'category'), name='unique_expense_rollup')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.10 on 2026-10-18 18:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run in a transaction. A plain CREATE
+    # INDEX would block writes to these large tables for the whole build
+    atomic = False
+
+    dependencies = [
+        ('activity_tracker', '0004_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # The new indexes first, so queries are covered before the old ones go
+    operations = [
+        AddIndexConcurrently(
+            model_name='activity',
+            index=models.Index(fields=['user', 'start_time'], include=('duration', 'activity_type'), name='activity_user_start_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='expense',
+            index=models.Index(fields=['user', 'year', 'category'], include=('amount',), name='expense_user_year_cat_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='expense',
+            name='activity_tr_user_id_7b3324_idx',
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='activityrollup',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, transaction
+
+# dashboard_view used to insert this row on the first visit of each day
+PLACEHOLDER = {'name': 'Hello', 'activity_type': 'Daily visit'}
+BATCH_SIZE = 1000
+
+
+def purge_placeholder_activities(apps, schema_editor):
+    from activity_tracker.chart_cache import invalidate_user_charts
+
+    alias = schema_editor.connection.alias
+    Activity = apps.get_model('activity_tracker', 'Activity')
+    ActivityRollup = apps.get_model('activity_tracker', 'ActivityRollup')
+
+    placeholders = Activity.objects.using(alias).filter(**PLACEHOLDER)
+    user_ids = set()
+    while batch := list(placeholders.values_list('pk', 'user_id')[:BATCH_SIZE]):
+        with transaction.atomic(using=alias):
+            Activity.objects.using(alias).filter(pk__in=[pk for pk, _ in batch]).delete()
+        user_ids.update(user_id for _, user_id in batch)
+    # 'Daily visit' is not a selectable type, so its rollups only ever
+    # counted placeholders
+    ActivityRollup.objects.using(alias).filter(activity_type=PLACEHOLDER['activity_type']).delete()
+    # Cached charts of these users still show the placeholders
+    for user_id in user_ids:
+        invalidate_user_charts(user_id)
+
+
+class Migration(migrations.Migration):
+    # Batches commit one by one instead of locking every row until the end
+    atomic = False
+
+    dependencies = [
+        ('activity_tracker', '0006_profile'),
+    ]
+
+    operations = [
+        migrations.RunPython(purge_placeholder_activities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.10 on 2026-10-18 18:58
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # See 0005: build the index without blocking writes to the table
+    atomic = False
+
+    dependencies = [
+        ('activity_tracker', '0007_purge_placeholder_activities'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='expense',
+            index=models.Index(fields=['user', 'amount', 'id'], name='expense_user_amount_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def set_lock_timeout(apps, schema_editor):
+    # ALTER TABLE needs a brief exclusive lock; give up rather than queue
+    # behind long transactions and block every query meanwhile
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("SET LOCAL lock_timeout = '5s'")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity_tracker', '0008_expense_user_amount_idx'),
+    ]
+
+    # Only a nullable column without a default is added, which PostgreSQL
+    # does without rewriting the table; 0010 fills it in batches
+    operations = [
+        migrations.RunPython(set_lock_timeout, set_lock_timeout),
+        migrations.AddField(
+            model_name='activity',
+            name='logged_duration',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='duration',
+            field=models.DurationField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='year',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='month',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='week',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
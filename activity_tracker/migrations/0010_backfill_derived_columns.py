@@ -0,0 +1,93 @@
+from django.db import migrations, transaction
+from django.db.models import Case, F, When
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractWeek, ExtractYear
+
+BATCH_SIZE = 1000
+
+# Keep the derived columns right whatever writes the row: QuerySet.update(),
+# raw SQL or another client. ISO weeks, as date.isocalendar() in the model
+TRIGGERS = """
+CREATE FUNCTION activity_tracker_activity_derive() RETURNS trigger AS $$
+BEGIN
+    NEW.duration := COALESCE(NEW.logged_duration, NEW.end_time - NEW.start_time);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER activity_tracker_activity_derive
+    BEFORE INSERT OR UPDATE ON activity_tracker_activity
+    FOR EACH ROW EXECUTE FUNCTION activity_tracker_activity_derive();
+
+CREATE FUNCTION activity_tracker_expense_derive() RETURNS trigger AS $$
+BEGIN
+    NEW.year := EXTRACT(YEAR FROM NEW.date);
+    NEW.month := EXTRACT(MONTH FROM NEW.date);
+    NEW.week := EXTRACT(WEEK FROM NEW.date);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER activity_tracker_expense_derive
+    BEFORE INSERT OR UPDATE ON activity_tracker_expense
+    FOR EACH ROW EXECUTE FUNCTION activity_tracker_expense_derive();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS activity_tracker_activity_derive ON activity_tracker_activity;
+DROP FUNCTION IF EXISTS activity_tracker_activity_derive();
+DROP TRIGGER IF EXISTS activity_tracker_expense_derive ON activity_tracker_expense;
+DROP FUNCTION IF EXISTS activity_tracker_expense_derive();
+"""
+
+
+def _in_batches(model, alias, update):
+    """Apply ``update`` to pk ranges of ``model``, one short transaction each."""
+    pks = model.objects.using(alias).order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while batch := list(pks.filter(pk__gt=last)[:BATCH_SIZE]):
+        last = batch[-1]
+        with transaction.atomic(using=alias):
+            update(model.objects.using(alias).filter(pk__in=batch))
+
+
+def backfill_derived_columns(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    # save() stored either the duration the user entered or a copy of
+    # end_time - start_time; only the entered ones become logged_duration,
+    # so the others follow later changes of the times
+    _in_batches(apps.get_model('activity_tracker', 'Activity'), alias, lambda activities: activities.update(
+        logged_duration=Case(
+            When(end_time__isnull=False, duration=F('end_time') - F('start_time'), then=None),
+            default=F('duration'),
+        ),
+        duration=Coalesce('duration', F('end_time') - F('start_time')),
+    ))
+    # update() and bulk paths could leave these empty or stale
+    _in_batches(apps.get_model('activity_tracker', 'Expense'), alias, lambda expenses: expenses.update(
+        year=ExtractYear('date'), month=ExtractMonth('date'), week=ExtractWeek('date'),
+    ))
+
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with transaction.atomic(using=schema_editor.connection.alias):
+        schema_editor.execute("SET LOCAL lock_timeout = '5s'")
+        schema_editor.execute(TRIGGERS)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGGERS)
+
+
+class Migration(migrations.Migration):
+    # Batches commit one by one instead of locking every row until the end
+    atomic = False
+
+    dependencies = [
+        ('activity_tracker', '0009_activity_logged_duration'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_derived_columns, migrations.RunPython.noop),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -1,10 +1,145 @@
+import operator
+import zoneinfo
+from collections import Counter, defaultdict
+from decimal import Decimal
+from functools import reduce
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.cache import cache
+from django.db import NotSupportedError, connections, models, router, transaction
+from django.db.models import F, Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
 from django.core.exceptions import ValidationError
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.utils import timezone
 from django.utils.timezone import now
+from .chart_cache import invalidate_user_charts
+
+
+def data_changed(*user_ids):
+    """Invalidate cached charts of the given users once the write commits."""
+    for user_id in set(user_ids):
+        transaction.on_commit(lambda user_id=user_id: invalidate_user_charts(user_id))
+
+
+# Row the dashboard used to insert on each user's first visit of the day;
+# see the purge_placeholder_activities command
+PLACEHOLDER_ACTIVITY = {'name': 'Hello', 'activity_type': 'Daily visit'}
+
+
+class ValidateOnceMixin:
+    """
+    Remembers the values of ``validated_fields`` that last passed ``clean()``,
+    so save() doesn't validate again what a ModelForm or a bulk method
+    already checked. Changing any of those fields re-arms the check.
+    """
+    validated_fields = ()
+
+    def _validation_key(self):
+        return tuple(getattr(self, name) for name in self.validated_fields)
+
+    def full_clean(self, *args, **kwargs):
+        super().full_clean(*args, **kwargs)
+        self._validated_key = self._validation_key()
+
+    def validate_once(self):
+        """Run ``clean()`` unless the current values already passed it."""
+        key = self._validation_key()
+        if getattr(self, '_validated_key', None) != key:
+            self.clean()
+            self._validated_key = key
+
+
+def validate_all(objs):
+    """Validate every object, raising one ValidationError for all failing rows."""
+    errors = []
+    for index, obj in enumerate(objs):
+        try:
+            obj.validate_once()
+        except ValidationError as e:
+            errors.extend(ValidationError(f"Row {index}: {message}") for message in e.messages)
+    if errors:
+        raise ValidationError(errors)
+
+
+class BulkSaveQuerySet(models.QuerySet):
+    """
+    bulk_create(), bulk_update() and delete() doing what save() and delete()
+    do for each object: validate it, fill in its derived fields and keep the
+    rollups current, in a few statements per batch instead of several per row.
+
+    Cascade deletes from the owning User skip the rollups, which that same
+    cascade removes.
+    """
+    # The model keeping the totals, with a record_many(objs, sign) classmethod
+    rollup_model = None
+    # Fields the rollup rows are keyed and summed on, and what those depend on
+    rollup_fields = ()
+    delete_batch_size = 1000
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False,
+                    update_fields=None, unique_fields=None):
+        if ignore_conflicts or update_conflicts:
+            # The rollups can't tell which rows were actually written
+            raise NotSupportedError("Conflict handling is not supported; save the rows one by one.")
+        objs = list(objs)
+        validate_all(objs)
+        for obj in objs:
+            obj.derive_fields()
+        with transaction.atomic(savepoint=False):
+            created = super().bulk_create(objs, batch_size=batch_size)
+            self.rollup_model.record_many(created, 1)
+            data_changed(*(obj.user_id for obj in created))
+        return created
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        fields = list(fields)
+        if set(fields) & set(self.model.derived_from):
+            fields += [name for name in self.model.derived_fields if name not in fields]
+        validate_all(objs)
+        for obj in objs:
+            obj.derive_fields()
+        with transaction.atomic(savepoint=False):
+            previous = []
+            if set(fields) & set(self.rollup_fields):
+                previous = list(self.model._base_manager.filter(pk__in=[obj.pk for obj in objs])
+                                .only(*self.rollup_fields))
+            rows = super().bulk_update(objs, fields, batch_size=batch_size)
+            if previous:
+                self.rollup_model.record_many(previous, -1)
+                self.rollup_model.record_many(objs, 1)
+                data_changed(*(obj.user_id for obj in previous), *(obj.user_id for obj in objs))
+        return rows
+
+    def delete(self):
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        deleted = Counter()
+        rows = self.order_by().only(*self.rollup_fields)
+        with transaction.atomic(savepoint=False):
+            while batch := list(rows[:self.delete_batch_size]):
+                self.rollup_model.record_many(batch, -1)
+                # The plain base manager, so this doesn't come back here
+                _, counts = self.model._base_manager.filter(pk__in=[obj.pk for obj in batch]).delete()
+                deleted.update(counts)
+                data_changed(*(obj.user_id for obj in batch))
+        return sum(deleted.values()), dict(deleted)
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class ActivityQuerySet(BulkSaveQuerySet):
+    rollup_fields = ('user', 'start_time', 'activity_type', 'duration', 'end_time', 'logged_duration')
 
-class Activity(models.Model):
+
+class ExpenseQuerySet(BulkSaveQuerySet):
+    rollup_fields = ('user', 'date', 'category', 'amount')
+
+
+class Activity(ValidateOnceMixin, models.Model):
     TAGS = [
         ('work', 'Work'),
         ('hobby', 'Hobby'),
@@ -15,18 +150,29 @@ class Activity(models.Model):
         ('other', 'Other')
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField(null=True, blank=True)
-    duration = models.DurationField(null=True, blank=True)
+    # Entered directly for activities without times; otherwise left empty
+    logged_duration = models.DurationField(null=True, blank=True)
+    # COALESCE(logged_duration, end_time - start_time), set by derive_fields()
+    # and, on PostgreSQL, by a trigger that also covers update() and raw SQL
+    duration = models.DurationField(null=True, blank=True, editable=False)
     
     activity_type = models.CharField(
         max_length=20, 
         choices=TAGS, 
         default='other'
     )
+
+    objects = ActivityQuerySet.as_manager()
+
+    validated_fields = ('start_time', 'end_time', 'logged_duration')
+    # derive_fields() fills in derived_fields from derived_from
+    derived_fields = ('duration',)
+    derived_from = ('start_time', 'end_time', 'logged_duration')
     
     def __str__(self):
         return self.name
@@ -39,26 +185,53 @@ class Activity(models.Model):
             raise ValidationError("End time must be after the start time.")
 
         # Example of enforcing duration validity
-        if self.duration is not None and self.duration.total_seconds() < 0:
+        if self.logged_duration is not None and self.logged_duration.total_seconds() < 0:
             raise ValidationError("Duration cannot be negative.")
 
-    def save(self, *args, **kwargs):
-        # Validate the input 
-        self.clean()
-        # Auto-calculate duration if not provided
-        if self.start_time and self.end_time and not self.duration:
+    def derive_fields(self):
+        # The value the trigger stores, so the rollups see it too
+        self.duration = self.logged_duration
+        if self.duration is None and self.start_time and self.end_time:
             self.duration = self.end_time - self.start_time
-        super().save(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        # Validate the input, unless a form already did
+        self.validate_once()
+        self.derive_fields()
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Activity.objects.filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            # Move this activity's contribution in the daily rollup
+            if previous is not None:
+                ActivityRollup.record(previous, -1)
+            ActivityRollup.record(self, 1)
+            data_changed(self.user_id, *([previous.user_id] if previous else []))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            ActivityRollup.record(self, -1)
+            data_changed(self.user_id)
+        return deleted
         
     class Meta:
         indexes = [
             models.Index(fields=['start_time']),
             models.Index(fields=['end_time']),
             models.Index(fields=['activity_type']),
+            # Dashboard lists: one user's activities in a start_time range.
+            # Leads with user, so the user foreign key needs no index of its own
+            models.Index(
+                fields=['user', 'start_time'],
+                include=['duration', 'activity_type'],
+                name='activity_user_start_idx',
+            ),
         ]
         
         
-class Expense(models.Model):
+class Expense(ValidateOnceMixin, models.Model):
     TAGS = [
         ('food', 'Food'),
         ('transport', 'Transport'),
@@ -68,7 +241,7 @@ class Expense(models.Model):
         ('other', 'Other')
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.CharField(max_length=20, choices=TAGS, default='other')
     date = models.DateField(default=datetime.now)
@@ -76,9 +249,17 @@ class Expense(models.Model):
     activity = models.ForeignKey('Activity', on_delete=models.SET_NULL, null=True, blank=True, 
                                 related_name='expenses')
     
-    year = models.IntegerField(null=True, blank=True)
-    month = models.IntegerField(null=True, blank=True)
-    week = models.IntegerField(null=True, blank=True)
+    # Calendar fields of date (ISO week), set by derive_fields() and, on
+    # PostgreSQL, by a trigger
+    year = models.IntegerField(null=True, blank=True, editable=False)
+    month = models.IntegerField(null=True, blank=True, editable=False)
+    week = models.IntegerField(null=True, blank=True, editable=False)
+
+    objects = ExpenseQuerySet.as_manager()
+
+    validated_fields = ('amount',)
+    derived_fields = ('year', 'month', 'week')
+    derived_from = ('date',)
 
     def __str__(self):
         # return f"{self.category} - {self.amount}"
@@ -90,21 +271,301 @@ class Expense(models.Model):
         if self.amount <= 0:
             raise ValidationError("Amount must be positive.")
         
-    def save(self, *args, **kwargs):
+    def derive_fields(self):
         if self.date:
             self.year = self.date.year
             self.month = self.date.month
             self.week = self.date.isocalendar()[1]
-        # Validate the input 
-        self.clean()
-        super().save(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        # Validate the input, unless a form already did
+        self.validate_once()
+        self.derive_fields()
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Expense.objects.filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            # Move this expense's contribution in the daily rollup
+            if previous is not None:
+                ExpenseRollup.record(previous, -1)
+            ExpenseRollup.record(self, 1)
+            data_changed(self.user_id, *([previous.user_id] if previous else []))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            ExpenseRollup.record(self, -1)
+            data_changed(self.user_id)
+        return deleted
         
     class Meta:
         indexes = [
-            models.Index(fields=['user']),
             models.Index(fields=['date']),
             models.Index(fields=['category']),
             models.Index(fields=['year']),
             models.Index(fields=['month']),
             models.Index(fields=['activity']),
-        ]
\ No newline at end of file
+            # Per-user yearly totals by category; together with (user, date)
+            # this also covers the user foreign key
+            models.Index(
+                fields=['user', 'year', 'category'],
+                include=['amount'],
+                name='expense_user_year_cat_idx',
+            ),
+            models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+            # Expenses page sorted by amount, id being the keyset tie-breaker
+            models.Index(fields=['user', 'amount', 'id'], name='expense_user_amount_idx'),
+        ]
+
+
+def validate_timezone(value):
+    try:
+        zoneinfo.ZoneInfo(value)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"Unknown time zone: {value}")
+
+
+class Profile(models.Model):
+    """Per-user settings. Users without a profile use ``settings.TIME_ZONE``."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
+    timezone = models.CharField(max_length=64, default='UTC', validators=[validate_timezone])
+
+    def __str__(self):
+        return f"{self.user} - {self.timezone}"
+
+    def clean(self):
+        super().clean()
+        validate_timezone(self.timezone)
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        with transaction.atomic():
+            previous = Profile.objects.filter(user_id=self.user_id) \
+                .values_list('timezone', flat=True).first()
+            super().save(*args, **kwargs)
+            if (previous or settings.TIME_ZONE) != self.timezone:
+                key = self.timezone_cache_key(self.user_id)
+                cache.delete(key)
+                transaction.on_commit(lambda: cache.delete(key))
+                # Rollup days are local days, so they move with the time zone
+                ActivityRollup.rebuild([self.user_id])
+
+    @staticmethod
+    def timezone_cache_key(user_id):
+        return f'user-timezone:{user_id}'
+
+    @classmethod
+    def timezone_for(cls, user_id):
+        """
+        The user's time zone for rendering pages, cached for
+        TIMEZONE_CACHE_TIMEOUT seconds since it is needed on every request.
+        Code that stores local days uses ``timezones_for`` instead.
+        """
+        key = cls.timezone_cache_key(user_id)
+        name = cache.get(key)
+        if name is None:
+            name = cls.objects.filter(user_id=user_id) \
+                .values_list('timezone', flat=True).first() or settings.TIME_ZONE
+            cache.set(key, name, settings.TIMEZONE_CACHE_TIMEOUT)
+        return zoneinfo.ZoneInfo(name)
+
+    @classmethod
+    def timezones_for(cls, user_ids):
+        """``{user_id: zone}`` read from the database, never from the cache."""
+        names = dict(cls.objects.filter(user_id__in=user_ids).values_list('user_id', 'timezone'))
+        return {user_id: zoneinfo.ZoneInfo(names.get(user_id, settings.TIME_ZONE)) for user_id in user_ids}
+
+    @classmethod
+    def split_by_timezone(cls, queryset):
+        """Yield (zone, queryset) pairs partitioning ``queryset`` by user time zone."""
+        zones = set(cls.objects.exclude(timezone=settings.TIME_ZONE)
+                    .values_list('timezone', flat=True).distinct())
+        yield zoneinfo.ZoneInfo(settings.TIME_ZONE), queryset.exclude(user__profile__timezone__in=zones)
+        for name in zones:
+            yield zoneinfo.ZoneInfo(name), queryset.filter(user__profile__timezone=name)
+
+
+def local_day(value, tz=None):
+    """Calendar day of a datetime in ``tz`` (default: the current time zone)."""
+    if isinstance(value, datetime):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return timezone.localdate(value, tz)
+    return value
+
+
+def apply_rollup_deltas(model, key_fields, deltas, sign, count_field, total_field):
+    """
+    Add ``sign`` times each ``{key: (count, total)}`` delta to its rollup row.
+
+    A single INSERT ... ON CONFLICT DO UPDATE (PostgreSQL and SQLite) adds to
+    the stored values in SQL, so concurrent writers never lose updates and a
+    batch costs one round trip however many rows it touches.
+    """
+    if not deltas:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in (*key_fields, count_field, total_field)]
+    table = quote(model._meta.db_table)
+    columns = [quote(field.column) for field in fields]
+    keys, (count, total) = columns[:-2], columns[-2:]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+        f"{count} = {table}.{count} + EXCLUDED.{count}, "
+        f"{total} = {table}.{total} + EXCLUDED.{total}"
+    )
+    params = [
+        [
+            field.get_db_prep_save(value, connection)
+            for field, value in zip(fields, (*key, delta_count * sign, delta_total * sign))
+        ]
+        for key, (delta_count, delta_total) in deltas.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+    if sign < 0:
+        matches = [Q(**dict(zip(key_fields, key))) for key in deltas]
+        model.objects.filter(reduce(operator.or_, matches), **{f'{count_field}__lte': 0}).delete()
+
+
+class ActivityRollup(models.Model):
+    """
+    Per-user daily totals of activities by type, kept up to date on every
+    Activity save/delete so dashboards don't have to scan raw activities.
+    Rebuild from scratch with ``manage.py rebuild_rollups``.
+    """
+    # Covered by the unique constraint, which leads with user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    day = models.DateField()
+    activity_type = models.CharField(max_length=20)
+    activity_count = models.IntegerField(default=0)
+    total_duration = models.DurationField(default=timedelta(0))
+
+    def __str__(self):
+        return f"{self.day} - {self.activity_type} - {self.activity_count}"
+
+    @classmethod
+    def record(cls, activity, sign):
+        """Add (sign=1) or remove (sign=-1) an activity from its rollup row."""
+        cls.record_many([activity], sign)
+
+    @classmethod
+    def record_many(cls, activities, sign=1):
+        """Apply the combined change of many activities in a few statements."""
+        activities = [activity for activity in activities if activity.start_time]
+        # A cached zone may be stale in other processes, and a wrong zone
+        # would file the activity under the wrong day
+        zones = Profile.timezones_for({activity.user_id for activity in activities})
+        deltas = defaultdict(lambda: [0, timedelta(0)])
+        for activity in activities:
+            key = (activity.user_id, local_day(activity.start_time, zones[activity.user_id]),
+                   activity.activity_type)
+            deltas[key][0] += 1
+            deltas[key][1] += activity.duration or timedelta(0)
+        apply_rollup_deltas(cls, ('user_id', 'day', 'activity_type'), deltas, sign,
+                            'activity_count', 'total_duration')
+
+    @classmethod
+    def rebuild(cls, users=None, batch_size=1000):
+        activities = Activity.objects.all()
+        rollups = cls.objects.all()
+        if users is not None:
+            activities = activities.filter(user__in=users)
+            rollups = rollups.filter(user__in=users)
+        with transaction.atomic():
+            user_ids = set(rollups.values_list('user_id', flat=True).distinct())
+            rollups.delete()
+            # Group by day in each user's own time zone
+            for tz, zone_activities in Profile.split_by_timezone(activities):
+                totals = zone_activities.annotate(day=TruncDate('start_time', tzinfo=tz)) \
+                    .values('user_id', 'day', 'activity_type') \
+                    .annotate(
+                        activity_count=Count('id'),
+                        total_duration=Coalesce(Sum('duration'), Value(timedelta(0))),
+                    ).order_by()
+                created = cls.objects.bulk_create(
+                    (cls(**row) for row in totals.iterator(chunk_size=batch_size)),
+                    batch_size=batch_size,
+                )
+                user_ids.update(rollup.user_id for rollup in created)
+            data_changed(*user_ids)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'day', 'activity_type'],
+                name='unique_activity_rollup',
+            ),
+        ]
+
+
+class ExpenseRollup(models.Model):
+    """
+    Per-user daily totals of expenses by category, kept up to date on every
+    Expense save/delete. Rebuild from scratch with ``manage.py rebuild_rollups``.
+    """
+    # Covered by the unique constraint, which leads with user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    day = models.DateField()
+    category = models.CharField(max_length=20)
+    expense_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day} - {self.category} - {self.total_amount}"
+
+    @classmethod
+    def record(cls, expense, sign):
+        """Add (sign=1) or remove (sign=-1) an expense from its rollup row."""
+        cls.record_many([expense], sign)
+
+    @classmethod
+    def record_many(cls, expenses, sign=1):
+        """Apply the combined change of many expenses in a few statements."""
+        to_decimal = Expense._meta.get_field('amount').to_python
+        deltas = defaultdict(lambda: [0, Decimal(0)])
+        for expense in expenses:
+            if not expense.date:
+                continue
+            key = (expense.user_id, local_day(expense.date), expense.category)
+            deltas[key][0] += 1
+            deltas[key][1] += to_decimal(expense.amount)
+        apply_rollup_deltas(cls, ('user_id', 'day', 'category'), deltas, sign,
+                            'expense_count', 'total_amount')
+
+    @classmethod
+    def rebuild(cls, users=None, batch_size=1000):
+        expenses = Expense.objects.all()
+        rollups = cls.objects.all()
+        if users is not None:
+            expenses = expenses.filter(user__in=users)
+            rollups = rollups.filter(user__in=users)
+        totals = expenses.values('user_id', 'category', day=F('date')) \
+            .annotate(
+                expense_count=Count('id'),
+                total_amount=Sum('amount'),
+            ).order_by()
+        with transaction.atomic():
+            user_ids = set(rollups.values_list('user_id', flat=True).distinct())
+            rollups.delete()
+            created = cls.objects.bulk_create(
+                (cls(**row) for row in totals.iterator(chunk_size=batch_size)),
+                batch_size=batch_size,
+            )
+            data_changed(*user_ids, *(rollup.user_id for rollup in created))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'day', 'category'],
+                name='unique_expense_rollup',
+            ),
+        ]
+
+
+# The rollup models are defined after the querysets that keep them current
+ActivityQuerySet.rollup_model = ActivityRollup
+ExpenseQuerySet.rollup_model = ExpenseRollup
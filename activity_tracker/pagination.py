@@ -0,0 +1,104 @@
+"""
+Keyset (cursor) pagination: each page continues after the last row of the
+previous one, so page N costs the same index range scan as page 1 instead
+of an OFFSET that reads and discards every earlier row.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Page:
+    items: list
+    next_cursor: str | None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    data = json.dumps([_plain(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, fields):
+    """Parse a cursor back into typed values for ``fields`` of ``model``."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError
+        return [
+            None if value is None else model._meta.get_field(field).to_python(value)
+            for field, value in zip(fields, values)
+        ]
+    except Exception as e:
+        raise InvalidCursor("Invalid page cursor") from e
+
+
+def _after(order_by, values):
+    """Rows strictly after ``values`` in ``order_by`` order."""
+    condition = Q()
+    equal = Q()
+    for term, value in zip(order_by, values):
+        field = term.lstrip('-')
+        lookup = 'lt' if term.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{field}__{lookup}': value})
+        equal &= Q(**{field: value})
+    # Repeat the leading bound on its own so it can drive the index range
+    first = order_by[0]
+    lead = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]})
+    return lead & condition
+
+
+def _page_query(queryset, order_by, cursor, page_size):
+    fields = [term.lstrip('-') for term in order_by]
+    if cursor:
+        queryset = queryset.filter(_after(order_by, decode_cursor(cursor, queryset.model, fields)))
+    return queryset.order_by(*order_by)[:page_size + 1], fields
+
+
+def _page(items, fields, page_size):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([
+            last[field] if isinstance(last, dict) else getattr(last, field) for field in fields
+        ])
+    return Page(items, next_cursor)
+
+
+def keyset_page(queryset, order_by, cursor=None, page_size=PAGE_SIZE):
+    """
+    One page of ``queryset`` in ``order_by`` order, starting after ``cursor``.
+    The last ``order_by`` field must be unique (normally the primary key) and
+    none of the fields may be NULL. Raises ``InvalidCursor``.
+    """
+    query, fields = _page_query(queryset, order_by, cursor, page_size)
+    return _page(list(query), fields, page_size)
+
+
+async def akeyset_page(queryset, order_by, cursor=None, page_size=PAGE_SIZE):
+    """Async version of ``keyset_page``."""
+    query, fields = _page_query(queryset, order_by, cursor, page_size)
+    return _page([item async for item in query], fields, page_size)
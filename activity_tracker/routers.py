@@ -0,0 +1,102 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+
+# Alias of the replica serving the current request's reads, if any
+_read_alias = ContextVar('activity_tracker_read_alias', default=None)
+
+PINNED_SESSION_KEY = 'replica_pinned_until'
+
+
+class ReplicaRouter:
+    """
+    Send activity_tracker reads to a replica inside views wrapped with
+    ``use_replica``; everything else, and all writes, use ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'activity_tracker':
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        pool = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def replica_alias():
+    """Alias of the replica serving the current reads, or None for the primary."""
+    return _read_alias.get()
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, even within a ``use_replica`` view."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pin_to_primary(request):
+    """
+    Read this user's requests from the primary for a while, so pages shown
+    right after a write include it even if the replicas are lagging.
+    """
+    request.session[PINNED_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+
+
+def _pinned(request):
+    return request.session.get(PINNED_SESSION_KEY, 0) > time.time()
+
+
+def _skip_replica(request):
+    return not settings.DATABASE_REPLICAS or request.method not in ('GET', 'HEAD')
+
+
+def use_replica(view):
+    """
+    Serve the view's activity_tracker reads from one randomly chosen replica
+    (read-only views only). Unsafe methods and recently pinned sessions stay
+    on the primary.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if (_skip_replica(request)
+                    or await request.session.aget(PINNED_SESSION_KEY, 0) > time.time()):
+                return await view(request, *args, **kwargs)
+            token = _read_alias.set(random.choice(settings.DATABASE_REPLICAS))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if _skip_replica(request) or _pinned(request):
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(random.choice(settings.DATABASE_REPLICAS))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
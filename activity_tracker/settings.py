@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 import environ
 import os
 
@@ -49,22 +50,30 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Let runserver serve static files through WhiteNoise as in production
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'activity_tracker',
     "crispy_forms",
     "crispy_bootstrap4",
-    "plotly",
-    "pandas",
     # "django-extensions",
     # "django-filter",
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves STATIC_ROOT: hashed names are cached for good, .br/.gz copies
+    # are picked by Accept-Encoding. WhiteNoise's own middleware made with
+    # async support, so ASGI requests don't all run in a thread
+    'activity_tracker.staticfiles.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    # Below CsrfViewMiddleware, whose response phase clears the flag telling
+    # whether a CSRF token was rendered; nothing after it reads the body
+    'activity_tracker.compression.CompressionMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'activity_tracker.middleware.UserTimezoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -104,6 +113,89 @@ DATABASES = {
     }
 }
 
+# How connections to PostgreSQL are reused, DB_CONN_MODE=
+#   persistent - keep each worker's connection for DB_CONN_MAX_AGE seconds,
+#                health checked before reuse (default)
+#   pool       - psycopg 3 connection pool per worker process,
+#                sized by DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE
+#   none       - open a new connection for every request
+DB_CONN_MODE = env('DB_CONN_MODE', default='persistent')
+if DB_CONN_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=60)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_CONN_MODE == 'pool':
+    # Pooled connections are returned to the pool after each request, so
+    # CONN_MAX_AGE must stay 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+            'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+            'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+        },
+    }
+elif DB_CONN_MODE != 'none':
+    raise ImproperlyConfigured(f"DB_CONN_MODE must be persistent, pool or none, not {DB_CONN_MODE!r}")
+
+# Read replicas of the primary, e.g. DB_REPLICA_HOSTS=replica1,replica2:5433.
+# Views wrapped with routers.use_replica read activity data from them
+DATABASE_REPLICAS = []
+for number, replica in enumerate(env.list('DB_REPLICA_HOSTS', default=[]), start=1):
+    host, _, port = replica.partition(':')
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        # Tests run against the primary's test database
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['activity_tracker.routers.ReplicaRouter']
+
+# After a user's write, read their pages from the primary for this long
+# to cover replication lag
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=10)
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# e.g. CACHE_URL=rediscache://redis:6379/1 or filecache:///var/tmp/django_cache
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Rendered dashboard charts, keyed per user and invalidated on writes
+CHART_CACHE_ALIAS = env('CHART_CACHE_ALIAS', default='default')
+CHART_CACHE_TIMEOUT = env.int('CHART_CACHE_TIMEOUT', default=60 * 60 * 24)
+
+# Seconds a user's time zone is cached for rendering pages. A change made
+# in one process reaches the others once their entry expires
+TIMEZONE_CACHE_TIMEOUT = env.int('TIMEZONE_CACHE_TIMEOUT', default=60)
+
+# Render the home page demo charts at startup (AppConfig.ready) instead of on
+# the first request
+WARM_DEMO_CHARTS = env.bool('WARM_DEMO_CHARTS', default=False)
+
+# Render the dashboard shell immediately and let the browser fetch the charts
+# from the JSON chart endpoints in parallel
+DASHBOARD_ASYNC_CHARTS = env.bool('DASHBOARD_ASYNC_CHARTS', default=False)
+
+# Otherwise the charts are built concurrently on a pool of this many threads
+# shared by all requests (0 builds them one by one in the request thread).
+# Charts not ready within the timeout (seconds) are left to the browser
+DASHBOARD_CHART_WORKERS = env.int('DASHBOARD_CHART_WORKERS', default=4)
+DASHBOARD_CHART_TIMEOUT = env.float('DASHBOARD_CHART_TIMEOUT', default=5.0)
+
+# Response compression: Brotli for pages without a CSRF token, gzip with a
+# randomly padded header otherwise (against BREACH). Responses under the
+# minimum size (bytes) are sent as is
+COMPRESSION_MIN_SIZE = env.int('COMPRESSION_MIN_SIZE', default=1024)
+COMPRESSION_GZIP_LEVEL = env.int('COMPRESSION_GZIP_LEVEL', default=4)
+COMPRESSION_BROTLI = env.bool('COMPRESSION_BROTLI', default=True)
+COMPRESSION_BROTLI_QUALITY = env.int('COMPRESSION_BROTLI_QUALITY', default=4)
+COMPRESSION_RANDOM_BYTES = env.int('COMPRESSION_RANDOM_BYTES', default=100)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -128,6 +220,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LANGUAGE_CODE = 'en-us'
 
+# Default for anonymous users and users without a Profile time zone
 TIME_ZONE = 'UTC'
 
 USE_I18N = True
@@ -144,6 +237,24 @@ STATICFILES_DIRS = [
     BASE_DIR /'static',
 ]
 
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    # Serves plotly.js from the installed plotly package as plotly/plotly.min.js
+    'activity_tracker.staticfiles.PlotlyJSFinder',
+]
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'activity_tracker.staticfiles.ManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,107 @@
+import importlib.util
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder
+from django.core.files.storage import FileSystemStorage
+from whitenoise import middleware as whitenoise
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+PLOTLY_JS_PATH = 'plotly/plotly.min.js'
+# Bytes read per step when streaming a file to an ASGI server
+ASYNC_BLOCK_SIZE = 2 ** 16
+
+
+def plotly_package_data_dir():
+    # Locate the bundle shipped with the plotly package without importing it
+    spec = importlib.util.find_spec('plotly')
+    return os.path.join(spec.submodule_search_locations[0], 'package_data')
+
+
+class PlotlyJSFinder(BaseFinder):
+    """
+    Expose the plotly.js bundle from the installed plotly package as the
+    static file ``plotly/plotly.min.js`` so it is served and collected like
+    any other asset instead of being inlined into every chart.
+    """
+    prefix, filename = PLOTLY_JS_PATH.split('/')
+
+    def __init__(self, *args, **kwargs):
+        self.storage = FileSystemStorage(location=plotly_package_data_dir())
+        self.storage.prefix = self.prefix
+        super().__init__(*args, **kwargs)
+
+    def find(self, path, all=False):
+        if path != PLOTLY_JS_PATH:
+            return [] if all else None
+        match = self.storage.path(self.filename)
+        if not os.path.exists(match):
+            return [] if all else None
+        return [match] if all else match
+
+    def list(self, ignore_patterns):
+        if self.storage.exists(self.filename):
+            yield self.filename, self.storage
+
+
+class ManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Content-hashed static file names (``plotly.min.<hash>.js``) so assets can
+    be cached for a long time, with ``.gz`` and ``.br`` copies written by
+    ``collectstatic`` for WhiteNoise to serve. Falls back to the plain name
+    for files that have not been through ``collectstatic`` yet, e.g. in tests.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+async def _aread(file, block_size):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    while chunk := await read(block_size):
+        yield chunk
+
+
+class WhiteNoiseMiddleware(whitenoise.WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs in an async middleware chain. WhiteNoise's own
+    middleware is sync only, so Django would run every request under ASGI,
+    static or not, through a thread for it, and then read each file whole
+    into memory. Here other requests go straight to the next middleware and
+    files are streamed through an async iterator.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        # Without WHITENOISE_ROOT only URLs under STATIC_URL can be files
+        self.static_only = not getattr(settings, 'WHITENOISE_ROOT', None)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.static_only and not request.path_info.startswith(self.static_prefix):
+            return await self.get_response(request)
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        # Opens the file
+        response = await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        if response.file_to_stream is not None:
+            response.streaming_content = _aread(response.file_to_stream, ASYNC_BLOCK_SIZE)
+        return response
@@ -0,0 +1,25 @@
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+
+@pytest.fixture(autouse=True)
+def _primary_only(request):
+    # Tests only get the default database unless they ask for the replicas,
+    # so keep replica-routed views on the primary by default
+    if settings.DATABASE_REPLICAS and 'replica_databases' not in request.fixturenames:
+        request.getfixturevalue('settings').DATABASE_REPLICAS = []
+
+
+@pytest.fixture(autouse=True)
+def _inline_charts(request):
+    # Chart pool threads use their own database connections, which can't see
+    # a test's uncommitted rows; tests of the pool turn the workers back on
+    if settings.DASHBOARD_CHART_WORKERS:
+        request.getfixturevalue('settings').DASHBOARD_CHART_WORKERS = 0
+
+
+@pytest.fixture
+def user(db):
+    User = get_user_model()
+    return User.objects.create_user(username='testuser', password='uwu2132')
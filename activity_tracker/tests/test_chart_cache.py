@@ -0,0 +1,83 @@
+import pytest
+from datetime import datetime
+from django.core.cache import caches
+from django.urls import reverse
+from activity_tracker import views
+from activity_tracker.chart_cache import chart_cache_stats, get_or_build_chart, reset_chart_cache_stats
+from activity_tracker.models import Activity
+
+
+@pytest.fixture(params=['locmem', 'file'])
+def chart_cache_backend(request, settings, tmp_path):
+    if request.param == 'locmem':
+        backend = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'charts-test'}
+    else:
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path)}
+    settings.CACHES = {**settings.CACHES, 'charts': backend}
+    settings.CHART_CACHE_ALIAS = 'charts'
+    caches['charts'].clear()
+    reset_chart_cache_stats()
+    return caches['charts']
+
+
+@pytest.mark.django_db
+def test_chart_is_built_once_per_data_version(chart_cache_backend, user, django_capture_on_commit_callbacks):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return '<div>chart</div>'
+
+    assert get_or_build_chart(user, 'daily_activities', build) == '<div>chart</div>'
+    assert get_or_build_chart(user, 'daily_activities', build) == '<div>chart</div>'
+    assert len(builds) == 1
+    assert chart_cache_stats() == {'hits': 1, 'misses': 1}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Activity.objects.create(
+            user=user,
+            name='Test Activity',
+            start_time=datetime(2023, 10, 1, 10, 0, 0),
+            end_time=datetime(2023, 10, 1, 11, 0, 0),
+        )
+    get_or_build_chart(user, 'daily_activities', build)
+    assert len(builds) == 2
+
+
+@pytest.mark.django_db
+def test_chart_cache_stats_are_shared_through_the_cache(chart_cache_backend, user):
+    # As counted by another worker
+    chart_cache_backend.set('chart-cache-stats:v1:hits', 41, timeout=None)
+    get_or_build_chart(user, 'daily_activities', lambda: '<div>chart</div>')
+    get_or_build_chart(user, 'daily_activities', lambda: '<div>chart</div>')
+    assert chart_cache_stats() == {'hits': 42, 'misses': 1}
+
+    reset_chart_cache_stats()
+    assert chart_cache_stats() == {'hits': 0, 'misses': 0}
+
+
+@pytest.mark.django_db
+def test_dashboard_refresh_skips_figure_build(chart_cache_backend, client, user, monkeypatch):
+    client.force_login(user)
+    client.get(reverse('dashboard'))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("chart should have been served from cache")
+
+    monkeypatch.setattr(views, 'create_daily_activities_chart', fail)
+    monkeypatch.setattr(views, 'create_activities_by_type_chart', fail)
+    monkeypatch.setattr(views, 'create_expenses_tree_chart', fail)
+    response = client.get(reverse('dashboard'))
+    assert response.status_code == 200
+    assert chart_cache_stats()['hits'] >= 3
+
+
+@pytest.mark.django_db
+def test_chart_cache_stats_view_requires_staff(client, user):
+    client.force_login(user)
+    assert client.get(reverse('chart_cache_stats')).status_code == 302
+    user.is_staff = True
+    user.save()
+    response = client.get(reverse('chart_cache_stats'))
+    assert response.status_code == 200
+    assert set(response.json()) == {'hits', 'misses'}
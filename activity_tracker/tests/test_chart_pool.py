@@ -0,0 +1,99 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from activity_tracker.chart_pool import acollect_charts, collect_charts, server_timing, submit_charts
+from activity_tracker.models import Activity
+
+# Workers close their connections after each chart, which needs database
+# access even for charts that don't query
+pytestmark = pytest.mark.django_db
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+def test_late_and_failing_charts_get_their_fallback(settings):
+    settings.DASHBOARD_CHART_WORKERS = 2
+    settings.DASHBOARD_CHART_TIMEOUT = 0.1
+    pending = submit_charts({
+        'fast': lambda: 'fast chart',
+        'slow': lambda: time.sleep(1) or 'slow chart',
+        'broken': _fail,
+    })
+    charts, timings = collect_charts(pending, {'fast': '-', 'slow': 'later', 'broken': 'oops'})
+
+    assert charts == {'fast': 'fast chart', 'slow': 'later', 'broken': 'oops'}
+    assert {name: status for name, (_, status) in timings.items()} == {
+        'fast': 'ok', 'slow': 'timeout', 'broken': 'error',
+    }
+    assert 'chart-slow;dur=' in server_timing(timings)
+
+
+def test_async_collect_waits_until_the_deadline(settings):
+    settings.DASHBOARD_CHART_WORKERS = 2
+    settings.DASHBOARD_CHART_TIMEOUT = 0.2
+    pending = submit_charts({
+        'quick': lambda: time.sleep(0.05) or 'quick chart',
+        'slow': lambda: time.sleep(1) or 'slow chart',
+    })
+    charts, timings = async_to_sync(acollect_charts)(pending, {'quick': '-', 'slow': 'later'})
+
+    assert charts == {'quick': 'quick chart', 'slow': 'later'}
+    assert timings['slow'][1] == 'timeout'
+
+
+def test_charts_build_in_workers_with_the_request_time_zone(settings):
+    settings.DASHBOARD_CHART_WORKERS = 2
+    build = lambda: (threading.current_thread().name, timezone.get_current_timezone_name())
+    with timezone.override('Asia/Tokyo'):
+        charts, _ = collect_charts(submit_charts({'chart': build}), {'chart': None})
+    thread, zone = charts['chart']
+    assert thread.startswith('dashboard-chart')
+    assert zone == 'Asia/Tokyo'
+
+
+def test_charts_build_inline_without_workers():
+    build = lambda: threading.current_thread().name
+    charts, _ = collect_charts(submit_charts({'chart': build}), {'chart': None})
+    assert charts['chart'] == threading.current_thread().name
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dashboard_builds_charts_in_the_pool(client, settings, monkeypatch):
+    settings.DASHBOARD_CHART_WORKERS = 2
+    # Workers close their connections after each chart, so none outlive the test
+    monkeypatch.setitem(connection.settings_dict, 'CONN_MAX_AGE', 0)
+    user = get_user_model().objects.create(username='testuser')
+    Activity.objects.create(user=user, name='Run', activity_type='exercise',
+                            start_time=timezone.now(), logged_duration=timedelta(minutes=30))
+    client.force_login(user)
+
+    response = client.get(reverse('dashboard'))
+
+    assert response.status_code == 200
+    timing = response['Server-Timing']
+    for name in ('daily-activities', 'activities-by-type', 'expenses-tree'):
+        assert f'chart-{name};dur=' in timing
+    assert 'desc="ok"' in timing and 'timeout' not in timing
+    assert 'data-chart-url' not in response.content.decode()
+
+
+def test_dashboard_falls_back_to_browser_fetch_for_failed_chart(client):
+    user = get_user_model().objects.create(username='testuser')
+    client.force_login(user)
+    with mock.patch('activity_tracker.views.create_daily_activities_chart', side_effect=RuntimeError):
+        response = client.get(reverse('dashboard'))
+
+    assert response.status_code == 200
+    assert f'data-chart-url="{reverse("chart_data", args=["daily-activities"])}"' in response.content.decode()
+    assert 'chart-daily-activities;' in response['Server-Timing']
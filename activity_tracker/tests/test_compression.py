@@ -0,0 +1,102 @@
+import gzip
+
+import brotli
+import pytest
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.test import RequestFactory
+from django.urls import reverse
+
+from activity_tracker.compression import CompressionMiddleware, accepted_encodings
+
+BODY = b'<p>Activity tracker</p>\n' * 200
+
+
+def respond(body=BODY, accept='gzip, br', content_type='text/html', csrf=False, **headers):
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+
+    def view(request):
+        if csrf:
+            get_token(request)
+        response = HttpResponse(body, content_type=content_type)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    return CompressionMiddleware(view)(request)
+
+
+def test_accepted_encodings_skip_refused_codings():
+    assert accepted_encodings('gzip;q=0.5, br, identity;q=0') == {'gzip', 'br'}
+    assert accepted_encodings('') == set()
+
+
+def test_brotli_for_pages_without_csrf_token():
+    response = respond()
+    assert response['Content-Encoding'] == 'br'
+    assert response['Vary'] == 'Accept-Encoding'
+    assert brotli.decompress(response.content) == BODY
+    assert response['Content-Length'] == str(len(response.content))
+
+
+def test_gzip_with_random_padding_for_pages_with_csrf_token():
+    response = respond(csrf=True)
+    assert response['Content-Encoding'] == 'gzip'
+    # The FNAME flag marks the random-length filename in the header
+    assert response.content[3] & gzip.FNAME
+    assert gzip.decompress(response.content) == BODY
+
+
+def test_gzip_when_brotli_is_not_accepted_or_disabled(settings):
+    assert respond(accept='gzip')['Content-Encoding'] == 'gzip'
+    settings.COMPRESSION_BROTLI = False
+    assert respond()['Content-Encoding'] == 'gzip'
+
+
+def test_level_and_minimum_size_are_configurable(settings):
+    settings.COMPRESSION_RANDOM_BYTES = 0
+    settings.COMPRESSION_GZIP_LEVEL = 1
+    fast = respond(accept='gzip').content
+    settings.COMPRESSION_GZIP_LEVEL = 9
+    assert respond(accept='gzip').content == gzip.compress(BODY, compresslevel=9, mtime=0)
+    assert gzip.decompress(fast) == BODY
+
+    settings.COMPRESSION_MIN_SIZE = len(BODY) + 1
+    assert not respond().has_header('Content-Encoding')
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'accept': 'identity'},
+    {'content_type': 'application/gzip'},
+    {'Content-Encoding': 'gzip'},
+])
+def test_responses_left_alone(kwargs):
+    response = respond(**kwargs)
+    assert response.content == BODY
+    assert response.get('Content-Encoding') == kwargs.get('Content-Encoding')
+
+
+def test_streaming_responses_are_not_compressed():
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+    response = CompressionMiddleware(lambda request: StreamingHttpResponse(iter([BODY])))(request)
+    assert not response.has_header('Content-Encoding')
+    assert b''.join(response.streaming_content) == BODY
+
+
+def test_strong_etag_made_weak():
+    assert respond(ETag='"abc"')['ETag'] == 'W/"abc"'
+
+
+@pytest.mark.django_db
+def test_dashboard_is_gzipped_and_chart_json_brotli_compressed(client):
+    user = get_user_model().objects.create_user(username='testuser', password='uwu2132')
+    client.force_login(user)
+    # The dashboard renders forms, so it carries a CSRF token
+    response = client.get(reverse('dashboard'), HTTP_ACCEPT_ENCODING='gzip, br')
+    assert response['Content-Encoding'] == 'gzip'
+    assert b'csrfmiddlewaretoken' in gzip.decompress(response.content)
+
+    response = client.get(reverse('chart_data', args=['daily-activities']), HTTP_ACCEPT_ENCODING='gzip, br')
+    assert response['Content-Encoding'] == 'br'
+    assert response['ETag'].startswith('W/"')
@@ -0,0 +1,59 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from activity_tracker.dashboard import aget_dashboard_data
+from activity_tracker.models import Activity, Expense
+
+
+@pytest.fixture
+def history(user):
+    now = timezone.now()
+    for days_ago, activity_type in [(0, 'Work'), (0, 'Sport'), (400, 'Work')]:
+        start_time = now - timedelta(days=days_ago)
+        Activity.objects.create(
+            user=user,
+            name='Test Activity',
+            activity_type=activity_type,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+    Expense.objects.create(user=user, amount=Decimal('10.00'), category='Food', date=now.date())
+    Expense.objects.create(user=user, amount=Decimal('5.00'), category='Travel',
+                           date=now.date() - timedelta(days=400))
+
+
+@pytest.mark.django_db
+def test_dashboard_data_aggregates(user, history):
+    data = async_to_sync(aget_dashboard_data)(user, 'day')
+    assert len(data.today_activities) == 2
+    assert data.activity_tag_stats == [
+        {'activity_type': 'Sport', 'activity_count': 1, 'total_duration': timedelta(hours=1)},
+        {'activity_type': 'Work', 'activity_count': 1, 'total_duration': timedelta(hours=1)},
+    ]
+    assert data.activities_by_type == {'activity_type': ['Sport', 'Work'], 'activity_count': [1, 1]}
+    # Last year's expense only counts towards the all-time treemap
+    assert [stat['category'] for stat in data.expenses_tag_stats] == ['Food']
+    assert data.expenses_by_category == {
+        'category': ['Food', 'Travel'],
+        'total_amount': [Decimal('10.00'), Decimal('5.00')],
+    }
+
+
+@pytest.mark.django_db
+def test_dashboard_data_query_count(user, history, django_assert_num_queries):
+    with django_assert_num_queries(3):
+        async_to_sync(aget_dashboard_data)(user, 'month')
+
+
+@pytest.mark.django_db
+def test_dashboard_view_query_count(client, user, history, django_assert_num_queries):
+    client.force_login(user)
+    # Warm the chart and time zone caches
+    client.get(reverse('dashboard'))
+    # Session, user and the three dashboard queries
+    with django_assert_num_queries(5):
+        response = client.get(reverse('dashboard'))
+    assert response.status_code == 200
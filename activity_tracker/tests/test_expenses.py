@@ -0,0 +1,89 @@
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+from activity_tracker.expenses import expense_page, expense_totals, filter_expenses
+from activity_tracker.models import Activity, Expense
+from activity_tracker.pagination import PAGE_SIZE
+
+
+@pytest.fixture
+def expenses(user):
+    activity = Activity.objects.create(
+        user=user, name='Trip', start_time=timezone.make_aware(datetime(2024, 2, 1, 9, 0)))
+    rows = [
+        (date(2024, 1, 5), 'food', '12.00', None),
+        (date(2024, 1, 20), 'transport', '30.00', activity),
+        (date(2024, 2, 1), 'food', '8.50', activity),
+        (date(2024, 2, 14), 'entertainment', '45.00', None),
+    ]
+    return [
+        Expense.objects.create(user=user, date=day, category=category, amount=Decimal(amount), activity=linked)
+        for day, category, amount, linked in rows
+    ]
+
+
+@pytest.mark.django_db
+def test_filter_expenses(user, expenses):
+    def amounts(**filters):
+        return sorted(str(e.amount) for e in filter_expenses(user, **filters))
+
+    assert amounts(category=['food']) == ['12.00', '8.50']
+    assert amounts(start=date(2024, 1, 20), end=date(2024, 2, 1)) == ['30.00', '8.50']
+    assert amounts(linked='unlinked') == ['12.00', '45.00']
+    assert amounts(activity=expenses[1].activity_id) == ['30.00', '8.50']
+    assert amounts(min_amount=Decimal('10'), max_amount=Decimal('40')) == ['12.00', '30.00']
+
+
+@pytest.mark.django_db
+def test_expense_totals_in_one_query(user, expenses, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        totals = expense_totals(filter_expenses(user))
+    assert (totals.total, totals.count) == (Decimal('95.50'), 4)
+    assert [(item['category'], item['total']) for item in totals.by_category] == [
+        ('Entertainment', Decimal('45.00')), ('Transport', Decimal('30.00')), ('Food', Decimal('20.50')),
+    ]
+    assert [(item['month'], item['count']) for item in totals.by_month] == [(2, 2), (1, 2)]
+
+
+@pytest.mark.django_db
+def test_expense_page_sorts_and_joins_activity(user, expenses, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        page = expense_page(filter_expenses(user), '-amount', page_size=3)
+        names = [expense.activity.name if expense.activity else None for expense in page.items]
+    assert [str(e.amount) for e in page.items] == ['45.00', '30.00', '12.00']
+    assert names == [None, 'Trip', None]
+    rest = expense_page(filter_expenses(user), '-amount', page.next_cursor, page_size=3)
+    assert [str(e.amount) for e in rest.items] == ['8.50']
+    assert not rest.has_next
+
+
+@pytest.mark.django_db
+def test_expenses_view_pages_through_filtered_expenses(client, user):
+    Expense.objects.bulk_create(
+        Expense(user=user, date=date(2024, 3, 1), category='food', amount=Decimal(i + 1))
+        for i in range(PAGE_SIZE + 2)
+    )
+    client.force_login(user)
+    response = client.get(reverse('expenses'), {'category': 'food', 'sort': 'amount'})
+    assert response.status_code == 200
+    assert len(response.context['expenses']) == PAGE_SIZE
+    assert response.context['totals'].count == PAGE_SIZE + 2
+    next_url = response.context['next_page_url']
+    assert 'category=food' in next_url and 'sort=amount' in next_url
+
+    response = client.get(reverse('expenses') + next_url)
+    assert [e.amount for e in response.context['expenses']] == [PAGE_SIZE + 1, PAGE_SIZE + 2]
+    assert 'next_page_url' not in response.context
+    assert response.context['first_page_url'] == '?category=food&sort=amount'
+
+
+@pytest.mark.django_db
+def test_expenses_view_reports_invalid_filters(client, user):
+    client.force_login(user)
+    response = client.get(reverse('expenses'), {'start': '2024-02-01', 'end': '2024-01-01'})
+    assert response.status_code == 200
+    assert 'expenses' not in response.context
+    assert b'End date must not be before the start date.' in response.content
+    assert client.get(reverse('expenses'), {'cursor': 'garbage'}).status_code == 400
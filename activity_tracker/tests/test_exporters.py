@@ -0,0 +1,106 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from activity_tracker.exporters import ACTIVITY_FIELDS, activity_rows, stream_export
+from activity_tracker.importers import import_activities
+from activity_tracker.models import Activity, Expense, Profile
+
+
+@pytest.fixture
+def history(user):
+    for day, activity_type in [(1, 'work'), (2, 'hobby'), (3, 'work')]:
+        start_time = timezone.make_aware(datetime(2024, 3, day, 9, 0))
+        activity = Activity.objects.create(
+            user=user,
+            name=f'Activity {day}',
+            activity_type=activity_type,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=day),
+        )
+        Expense.objects.create(user=user, activity=activity, amount=Decimal('2.50') * day,
+                               category='food', date=date(2024, 3, day))
+
+
+def content(response):
+    return b''.join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_export_activities_csv_with_filters(client, user, history):
+    client.force_login(user)
+    response = client.get(reverse('export_activities'),
+                          {'start': '2024-03-02', 'end': '2024-03-03', 'type': 'work'})
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == 'attachment; filename="activities.csv"'
+    rows = list(csv.DictReader(io.StringIO(content(response).decode())))
+    assert [(row['name'], row['duration']) for row in rows] == [('Activity 3', '03:00:00')]
+
+
+@pytest.mark.django_db
+def test_export_activities_round_trips_through_importer(client, user, history):
+    Profile.objects.create(user=user, timezone='Europe/Warsaw')
+    client.force_login(user)
+    exported = content(client.get(reverse('export_activities'))).decode()
+
+    other = get_user_model().objects.create_user(username='other', password='uwu2132')
+    result = import_activities(other, io.StringIO(exported))
+    assert result.activities == 3
+    assert list(Activity.objects.filter(user=other).order_by('start_time').values_list(
+        'name', 'start_time', 'duration')) == list(Activity.objects.filter(user=user).order_by(
+        'start_time').values_list('name', 'start_time', 'duration'))
+
+
+@pytest.mark.django_db
+def test_export_expenses_ndjson_gzip(client, user, history):
+    client.force_login(user)
+    response = client.get(reverse('export_expenses'), {'format': 'ndjson', 'gzip': '1', 'start': '2024-03-02'})
+    assert response['Content-Type'] == 'application/gzip'
+    assert response['Content-Disposition'] == 'attachment; filename="expenses.ndjson.gz"'
+    lines = gzip.decompress(content(response)).decode().splitlines()
+    assert [json.loads(line)['amount'] for line in lines] == ['5.00', '7.50']
+
+
+@pytest.mark.django_db
+def test_export_rejects_bad_filters(client, user):
+    client.force_login(user)
+    url = reverse('export_activities')
+    assert client.get(url, {'type': 'food'}).status_code == 400
+    assert client.get(url, {'start': '2024-03-02', 'end': '2024-03-01'}).status_code == 400
+    assert client.get(url, {'format': 'xml'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_stream_export_yields_one_chunk_per_batch(user, history):
+    chunks = list(stream_export(activity_rows(user), ACTIVITY_FIELDS, 'ndjson', chunk_size=2))
+    assert [chunk.count(b'\n') for chunk in chunks] == [2, 1]
+
+
+@pytest.mark.django_db
+def test_export_over_asgi_streams_chunks_one_at_a_time(async_client, user, history, monkeypatch):
+    from asgiref.sync import async_to_sync
+    from activity_tracker import exporters
+
+    monkeypatch.setattr(exporters, 'CHUNK_SIZE', 1)
+    encoded = []
+    rows = exporters._Encoder.rows
+    monkeypatch.setattr(exporters._Encoder, 'rows', lambda self, batch: encoded.append(batch) or rows(self, batch))
+    async_client.force_login(user)
+    response = async_to_sync(async_client.get)(reverse('export_activities'), {'format': 'ndjson'})
+    assert response.is_async
+
+    async def receive():
+        received = []
+        async for chunk in response.streaming_content:
+            # Each row is read and encoded only once the previous chunk is sent
+            assert len(encoded) == len(received) + 1
+            received.append(json.loads(chunk)['name'])
+        return received
+
+    assert async_to_sync(receive)() == ['Activity 1', 'Activity 2', 'Activity 3']
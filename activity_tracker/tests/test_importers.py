@@ -0,0 +1,126 @@
+import io
+import json
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from activity_tracker.importers import decode_lines, import_activities
+from activity_tracker.models import Activity, ActivityRollup, Expense, ExpenseRollup
+
+CSV = """name,activity_type,start_time,end_time,expense_amount,expense_category
+Run,exercise,2024-03-01 07:00,2024-03-01 08:00,,
+Lunch,personal,2024-03-01 12:00,2024-03-01 12:30,15.50,food
+,work,2024-03-01 09:00,,,
+Bad time,work,2024-03-01 10:00,2024-03-01 09:00,,
+Cinema,hobby,2024-03-02 20:00,,-3,entertainment
+Study,learning,2024-03-02 18:00,2024-03-02 20:00,,
+"""
+
+
+def rollups():
+    return (
+        sorted(ActivityRollup.objects.values_list('day', 'activity_type', 'activity_count', 'total_duration')),
+        sorted(ExpenseRollup.objects.values_list('day', 'category', 'expense_count', 'total_amount')),
+    )
+
+
+@pytest.mark.django_db
+def test_csv_import_skips_invalid_rows_and_updates_rollups(user):
+    result = import_activities(user, io.StringIO(CSV), 'csv', batch_size=2)
+
+    assert (result.rows, result.activities, result.expenses, result.error_count) == (6, 3, 1, 3)
+    assert [error['line'] for error in result.errors] == [4, 5, 6]
+    lunch = Activity.objects.get(name='Lunch')
+    assert lunch.duration == timedelta(minutes=30)
+    expense = Expense.objects.get()
+    assert (expense.activity, expense.amount, expense.year, expense.month, expense.week) == \
+        (lunch, Decimal('15.50'), 2024, 3, 9)
+
+    # The batched rollup updates match a rebuild from the raw rows
+    imported = rollups()
+    call_command('rebuild_rollups')
+    assert rollups() == imported
+
+
+@pytest.mark.django_db
+def test_jsonl_import(user):
+    lines = [
+        json.dumps({'name': 'Walk', 'start_time': '2024-03-01T07:00:00+01:00', 'duration': 'PT45M'}),
+        '',
+        '{not json',
+        json.dumps(['a', 'list']),
+    ]
+    result = import_activities(user, io.StringIO('\n'.join(lines)), 'jsonl')
+
+    assert (result.activities, result.error_count) == (1, 2)
+    walk = Activity.objects.get()
+    assert (walk.activity_type, walk.duration) == ('other', timedelta(minutes=45))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('duration', ['"999999999999 days"', '1e300', 'Infinity'])
+def test_out_of_range_duration_is_reported_per_row(user, duration):
+    lines = [
+        '{"name": "Walk", "start_time": "2024-03-01T07:00", "duration": "PT45M"}',
+        '{"name": "Forever", "start_time": "2024-03-01T08:00", "duration": %s}' % duration,
+        '{"name": "Run", "start_time": "2024-03-01T09:00"}',
+    ]
+    result = import_activities(user, io.StringIO('\n'.join(lines)), 'jsonl')
+
+    assert result.errors == [{'line': 2, 'error': 'duration is out of range'}]
+    assert sorted(Activity.objects.values_list('name', flat=True)) == ['Run', 'Walk']
+
+
+@pytest.mark.django_db
+def test_import_reads_utf8_with_byte_order_mark(user):
+    result = import_activities(user, decode_lines(io.BytesIO(CSV.encode('utf-8-sig'))), 'csv')
+    assert (result.activities, result.error_count) == (3, 3)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fmt, data', [
+    ('csv', CSV.encode() + b'Caf\xe9,personal,2024-03-03 09:00,,,\nLater,work,2024-03-03 10:00,,,\n'),
+    # Fields over csv.field_size_limit() raise csv.Error
+    ('csv', CSV.encode() + b'"' + b'x' * 200_000 + b'",work,2024-03-03 09:00,,,\n'),
+    ('jsonl', b'{"name": "Walk", "start_time": "2024-03-01T07:00"}\n\n{"name": "Caf\xe9"}\n'),
+], ids=['csv-encoding', 'csv-error', 'jsonl-encoding'])
+def test_unreadable_line_ends_import_with_partial_result(user, settings, fmt, data):
+    result = import_activities(user, decode_lines(io.BytesIO(data)), fmt, batch_size=2)
+
+    last = result.errors[-1]
+    assert last['line'] == (8 if fmt == 'csv' else 3)
+    assert last['error'].startswith(('Invalid text encoding', 'Invalid CSV'))
+    # Rows before the bad line were imported
+    assert result.activities == Activity.objects.count() == (3 if fmt == 'csv' else 1)
+
+
+@pytest.mark.django_db
+def test_import_activities_command(user, tmp_path, capsys):
+    path = tmp_path / 'activities.csv'
+    path.write_text(CSV)
+    call_command('import_activities', str(path), user='testuser', batch_size=100)
+    out, err = capsys.readouterr()
+    assert 'Imported 3 activities and 1 expenses from 6 rows' in out
+    assert 'line 4: name is required' in err
+
+
+@pytest.mark.django_db
+def test_import_endpoint_streams_uploaded_file(client, user, settings):
+    # Force the upload to a temporary file, as large files would be
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 0
+    client.force_login(user)
+    # As saved by Excel, with a byte order mark
+    upload = SimpleUploadedFile('activities.csv', CSV.encode('utf-8-sig'))
+    response = client.post(reverse('import_activities'), {'file': upload})
+    assert response.status_code == 200
+    assert response.json()['activities'] == 3
+    assert Activity.objects.filter(user=user).count() == 3
+
+
+@pytest.mark.django_db
+def test_import_endpoint_requires_post_and_file(client, user):
+    client.force_login(user)
+    assert client.get(reverse('import_activities')).status_code == 405
+    assert client.post(reverse('import_activities')).status_code == 400
@@ -1,8 +1,12 @@
 import pytest
-from activity_tracker.models import Activity, User, Expense      
-from datetime import datetime, timedelta
+from activity_tracker.models import Activity, User, Expense, ActivityRollup, ExpenseRollup, Profile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+import zoneinfo
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models
 
 
 # Activity model tests
@@ -53,7 +57,7 @@ def test_activity_creation_negative_duration_raises_validation_error():
         name="Test Activity",
         description="This is a test activity",
         start_time=datetime(2023, 10, 1, 10, 0, 0),
-        duration=timedelta(hours=-1),  # Negative duration
+        logged_duration=timedelta(hours=-1),  # Negative duration
     )
     with pytest.raises(ValidationError, match="Duration cannot be negative."):
         activity.full_clean()
@@ -67,7 +71,7 @@ def test_activity_creation_with_duration():
         name="Test Activity",
         description="This is a test activity",
         start_time=datetime(2023, 10, 1, 10, 0, 0),
-        duration=timedelta(hours=1),  # Duration provided
+        logged_duration=timedelta(hours=1),  # Duration provided
     )
 
     assert activity.duration == timedelta(hours=1)
@@ -156,6 +160,306 @@ def test_expense_creation_with_activity():
     assert expense.activity.description == "This is a test activity"
     assert expense.activity.start_time == datetime(2023, 10, 1, 10, 0, 0)
 
+# Rollup tests
+
+@pytest.mark.django_db
+def test_activity_rollup_follows_save_and_delete():
+    user = User.objects.create(username="testuser")
+    activity = Activity.objects.create(
+        user=user,
+        activity_type="work",
+        name="Test Activity",
+        start_time=datetime(2023, 10, 1, 10, 0, 0),
+        end_time=datetime(2023, 10, 1, 11, 0, 0),
+    )
+    Activity.objects.create(
+        user=user,
+        activity_type="work",
+        name="Second Activity",
+        start_time=datetime(2023, 10, 1, 12, 0, 0),
+        logged_duration=timedelta(minutes=30),
+    )
+    rollup = ActivityRollup.objects.get(user=user, day=date(2023, 10, 1), activity_type="work")
+    assert rollup.activity_count == 2
+    assert rollup.total_duration == timedelta(minutes=90)
+
+    activity.activity_type = "hobby"
+    activity.save()
+    rollup.refresh_from_db()
+    assert rollup.activity_count == 1
+    assert rollup.total_duration == timedelta(minutes=30)
+    assert ActivityRollup.objects.get(user=user, activity_type="hobby").activity_count == 1
+
+    Activity.objects.filter(user=user).delete()
+    assert not ActivityRollup.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+def test_expense_rollup_follows_save_and_delete():
+    user = User.objects.create(username="testuser")
+    expense = Expense.objects.create(user=user, amount=100.00, category='food', date=date(2023, 10, 1))
+    Expense.objects.create(user=user, amount=20.50, category='food', date=date(2023, 10, 1))
+    rollup = ExpenseRollup.objects.get(user=user, day=date(2023, 10, 1), category='food')
+    assert rollup.expense_count == 2
+    assert rollup.total_amount == Decimal('120.50')
+
+    expense.delete()
+    rollup.refresh_from_db()
+    assert rollup.expense_count == 1
+    assert rollup.total_amount == Decimal('20.50')
+
+
+@pytest.mark.django_db
+def test_queryset_delete_updates_rollups_in_batches(monkeypatch, django_assert_num_queries):
+    monkeypatch.setattr(Activity.objects._queryset_class, 'delete_batch_size', 2)
+    user = User.objects.create(username="testuser")
+    Activity.objects.bulk_create([
+        Activity(user=user, activity_type="work", name="Test Activity",
+                 start_time=datetime(2023, 10, 1, hour, 0, 0), logged_duration=timedelta(minutes=hour))
+        for hour in range(8, 13)
+    ])
+    kept = Activity.objects.get(start_time__hour=12)
+
+    # Seven queries per batch of two, not per row: read the rows and their
+    # users' zones, apply and prune the rollup change, then the cascade's
+    # read, expense unlinking and delete; and the final empty read
+    with django_assert_num_queries(2 * 7 + 1):
+        deleted = Activity.objects.exclude(pk=kept.pk).delete()
+
+    assert deleted == (4, {'activity_tracker.Activity': 4})
+    rollup = ActivityRollup.objects.get(user=user)
+    assert (rollup.activity_count, rollup.total_duration) == (1, timedelta(minutes=12))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('rows', [1, 50])
+def test_deleting_user_skips_rollup_upkeep(rows, django_assert_max_num_queries):
+    user = User.objects.create(username="testuser")
+    activities = Activity.objects.bulk_create([
+        Activity(user=user, name="Test Activity", start_time=datetime(2023, 10, 1, 8, 0, 0) + timedelta(hours=i),
+                 logged_duration=timedelta(minutes=30))
+        for i in range(rows)
+    ])
+    Expense.objects.bulk_create([
+        Expense(user=user, amount=10, date=date(2023, 10, 1) + timedelta(days=i), activity=activity)
+        for i, activity in enumerate(activities)
+    ])
+
+    # The cascade removes the rollups too, in the same number of queries
+    # however many rows the user has
+    with django_assert_max_num_queries(12):
+        user.delete()
+
+    assert not ActivityRollup.objects.exists()
+    assert not ExpenseRollup.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_rollups_command_matches_incremental_rollups():
+    user = User.objects.create(username="testuser")
+    for hour in (8, 10, 12):
+        Activity.objects.create(
+            user=user,
+            activity_type="work",
+            name="Test Activity",
+            start_time=datetime(2023, 10, 1, hour, 0, 0),
+            end_time=datetime(2023, 10, 1, hour + 1, 0, 0),
+        )
+    Expense.objects.create(user=user, amount=10, category='food', date=date(2023, 10, 1))
+    expected = list(ActivityRollup.objects.values('day', 'activity_type', 'activity_count', 'total_duration'))
+    ActivityRollup.objects.all().delete()
+    ExpenseRollup.objects.all().delete()
+
+    call_command('rebuild_rollups')
+
+    assert list(ActivityRollup.objects.values('day', 'activity_type', 'activity_count', 'total_duration')) == expected
+    assert ExpenseRollup.objects.get(user=user).total_amount == 10
+
+
+@pytest.mark.django_db
+def test_purge_placeholder_activities_command():
+    user = User.objects.create(username="testuser")
+    for day in (1, 2, 3):
+        Activity.objects.create(
+            user=user,
+            name='Hello',
+            activity_type='Daily visit',
+            start_time=datetime(2023, 10, day, 9, 0, 0),
+        )
+    kept = Activity.objects.create(
+        user=user,
+        name='Hello',
+        activity_type='work',
+        start_time=datetime(2023, 10, 1, 10, 0, 0),
+    )
+
+    call_command('purge_placeholder_activities', batch_size=2)
+
+    assert list(Activity.objects.all()) == [kept]
+    assert list(ActivityRollup.objects.values_list('activity_type', flat=True)) == ['work']
+
+
+@pytest.mark.django_db
+def test_seed_load_command_creates_consistent_data(clear_cache):
+    call_command('seed_load', users=2, years=0.2, seed=1, prefix='load')
+
+    users = User.objects.filter(username__startswith='load')
+    assert users.count() == 2
+    assert Activity.objects.filter(user__in=users).count() > 100
+    assert Expense.objects.filter(activity__isnull=False).exists()
+    rollups = list(ActivityRollup.objects.order_by('user', 'day', 'activity_type')
+                   .values_list('user', 'day', 'activity_type', 'activity_count', 'total_duration'))
+    ActivityRollup.rebuild()
+    assert list(ActivityRollup.objects.order_by('user', 'day', 'activity_type')
+                .values_list('user', 'day', 'activity_type', 'activity_count', 'total_duration')) == rollups
+
+
+@pytest.mark.django_db
+def test_seed_load_clear_only_deletes_generated_users(clear_cache):
+    call_command('seed_load', users=2, years=0.01, seed=1, prefix='load')
+    User.objects.create(username='loader')
+    User.objects.create(username='load7x')
+
+    call_command('seed_load', users=1, years=0.01, seed=1, prefix='load', clear=True)
+
+    assert sorted(User.objects.values_list('username', flat=True)) == ['load0', 'load7x', 'loader']
+
+
+@pytest.fixture
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_activity_rollup_uses_the_users_timezone(clear_cache):
+    user = User.objects.create(username="testuser")
+    activity = Activity.objects.create(
+        user=user,
+        activity_type="work",
+        name="Late Activity",
+        start_time=datetime(2023, 10, 2, 2, 0, 0, tzinfo=zoneinfo.ZoneInfo('UTC')),
+        logged_duration=timedelta(hours=1),
+    )
+    assert ActivityRollup.objects.get(user=user).day == date(2023, 10, 2)
+
+    # Changing the time zone moves existing activities to their local day
+    Profile.objects.create(user=user, timezone='America/New_York')
+    assert ActivityRollup.objects.get(user=user).day == date(2023, 10, 1)
+
+    activity.save()
+    assert ActivityRollup.objects.get(user=user).day == date(2023, 10, 1)
+
+
+@pytest.mark.django_db
+def test_activity_rollup_ignores_a_stale_cached_timezone(clear_cache, settings):
+    user = User.objects.create(username="testuser")
+    Profile.objects.create(user=user, timezone='America/New_York')
+    # As left behind in another worker's cache before the profile changed
+    cache.set(Profile.timezone_cache_key(user.pk), 'UTC', settings.TIMEZONE_CACHE_TIMEOUT)
+    assert Profile.timezone_for(user.pk) == zoneinfo.ZoneInfo('UTC')
+
+    Activity.objects.create(
+        user=user,
+        activity_type="work",
+        name="Late Activity",
+        start_time=datetime(2023, 10, 2, 2, 0, 0, tzinfo=zoneinfo.ZoneInfo('UTC')),
+        logged_duration=timedelta(hours=1),
+    )
+    assert ActivityRollup.objects.get(user=user).day == date(2023, 10, 1)
+
+
+def test_profile_rejects_unknown_timezone():
+    with pytest.raises(ValidationError, match="Unknown time zone"):
+        Profile(timezone='Mars/Olympus_Mons').clean()
+
+# Bulk save paths
+
+@pytest.mark.django_db
+def test_bulk_create_derives_fields_and_updates_rollups():
+    user = User.objects.create(username="testuser")
+    activities = Activity.objects.bulk_create(
+        Activity(user=user, name=f"Activity {hour}", activity_type="work",
+                 start_time=datetime(2023, 10, 1, hour, 0, 0),
+                 end_time=datetime(2023, 10, 1, hour, 30, 0))
+        for hour in (8, 9)
+    )
+    Expense.objects.bulk_create([Expense(user=user, amount=10, category='food', date=date(2023, 10, 1))])
+
+    assert [a.duration for a in activities] == [timedelta(minutes=30)] * 2
+    assert Expense.objects.get(user=user).week == 39
+    rollup = ActivityRollup.objects.get(user=user)
+    assert (rollup.activity_count, rollup.total_duration) == (2, timedelta(hours=1))
+    assert ExpenseRollup.objects.get(user=user).total_amount == 10
+
+
+@pytest.mark.django_db
+def test_bulk_create_reports_every_invalid_row_and_saves_nothing():
+    user = User.objects.create(username="testuser")
+    expenses = [Expense(user=user, amount=amount, date=date(2023, 10, 1)) for amount in (5, -1, 0)]
+    with pytest.raises(ValidationError) as error:
+        Expense.objects.bulk_create(expenses)
+    assert error.value.messages == ["Row 1: Amount must be positive.", "Row 2: Amount must be positive."]
+    assert not Expense.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_update_rederives_fields_and_moves_rollups():
+    user = User.objects.create(username="testuser")
+    expense = Expense.objects.create(user=user, amount=10, category='food', date=date(2023, 10, 1))
+    expense.date = date(2024, 2, 1)
+    expense.category = 'bills'
+
+    Expense.objects.bulk_update([expense], ['date', 'category'])
+
+    expense.refresh_from_db()
+    assert (expense.year, expense.month, expense.week) == (2024, 2, 5)
+    assert list(ExpenseRollup.objects.values_list('day', 'category')) == [(date(2024, 2, 1), 'bills')]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason="the triggers are PostgreSQL only")
+def test_triggers_keep_derived_columns_current_after_update():
+    user = User.objects.create(username="testuser")
+    activity = Activity.objects.create(user=user, name="Run", start_time=datetime(2023, 10, 1, 10, 0, 0),
+                                       end_time=datetime(2023, 10, 1, 11, 0, 0))
+    expense = Expense.objects.create(user=user, amount=10, date=date(2023, 10, 1))
+
+    Activity.objects.filter(pk=activity.pk).update(end_time=datetime(2023, 10, 1, 12, 0, 0))
+    activity.refresh_from_db()
+    assert activity.duration == timedelta(hours=2)
+    Activity.objects.filter(pk=activity.pk).update(logged_duration=timedelta(minutes=5))
+    activity.refresh_from_db()
+    assert activity.duration == timedelta(minutes=5)
+
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE activity_tracker_expense SET date = '2024-01-01' WHERE id = %s", [expense.pk])
+    expense.refresh_from_db()
+    # 2024-01-01 is in ISO week 1 of 2024
+    assert (expense.year, expense.month, expense.week) == (2024, 1, 1)
+
+
+@pytest.mark.django_db
+def test_save_skips_validation_a_form_already_ran(monkeypatch):
+    from activity_tracker.forms import ActivityForm
+    calls = []
+    clean = Activity.clean
+    monkeypatch.setattr(Activity, 'clean', lambda self: calls.append(self) or clean(self))
+    form = ActivityForm({'name': 'Run', 'start_time': '2023-10-01T10:00', 'end_time': '2023-10-01T11:00',
+                         'activity_type': 'exercise'})
+    assert form.is_valid()
+    activity = form.save(commit=False)
+    activity.user = User.objects.create(username="testuser")
+    activity.save()
+    assert len(calls) == 1
+
+    # Changed times are validated again
+    activity.end_time = activity.start_time
+    with pytest.raises(ValidationError):
+        activity.save()
+    assert len(calls) == 2
+
 # Class Expense(models.Model):
 #     TAGS = [
 #         ('food', 'Food'),
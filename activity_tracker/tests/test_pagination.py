@@ -0,0 +1,74 @@
+import pytest
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from activity_tracker.dashboard import aactivity_list_page
+from activity_tracker.models import Activity
+from activity_tracker.pagination import PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture
+def activities(user):
+    # Seven activities this week, two of them sharing a start time
+    now = timezone.now().replace(microsecond=123456)
+    week_start = now - timedelta(days=now.weekday())
+    times = [week_start + timedelta(minutes=minutes) for minutes in (0, 10, 10, 20, 30, 40, 50)]
+    return [
+        Activity.objects.create(user=user, name=f'Activity {i}', start_time=start_time)
+        for i, start_time in enumerate(times)
+    ]
+
+
+def test_cursor_round_trip():
+    now = timezone.now()
+    cursor = encode_cursor([now, 42])
+    assert decode_cursor(cursor, Activity, ['start_time', 'id']) == [now, 42]
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor', Activity, ['start_time', 'id'])
+
+
+@pytest.mark.django_db
+def test_keyset_pages_cover_every_row_once(user, activities):
+    seen = []
+    cursor = None
+    while True:
+        page = keyset_page(Activity.objects.filter(user=user), ('-start_time', '-id'), cursor, page_size=3)
+        seen.extend(page.items)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    expected = sorted(activities, key=lambda a: (a.start_time, a.id), reverse=True)
+    assert [a.pk for a in seen] == [a.pk for a in expected]
+
+
+@pytest.mark.django_db
+def test_activity_list_page_loads_only_listed_columns(user, activities):
+    page = async_to_sync(aactivity_list_page)(user, 'week', page_size=3)
+    assert page.items[0].get_deferred_fields() == {'user_id', 'description', 'logged_duration'}
+
+
+@pytest.mark.django_db
+def test_week_view_renders_first_page_and_scroll_endpoint_the_rest(client, user):
+    week_start = timezone.now() - timedelta(days=timezone.now().weekday())
+    Activity.objects.bulk_create(
+        Activity(user=user, name=f'Activity {i}', start_time=week_start + timedelta(seconds=i))
+        for i in range(PAGE_SIZE + 5)
+    )
+    client.force_login(user)
+    response = client.get(reverse('dashboard_week'))
+    assert len(response.context['today_activities']) == PAGE_SIZE
+    next_url = response.context['next_activities_url']
+    assert f'data-next-url="{next_url.replace("&", "&amp;")}"' in response.content.decode()
+
+    data = client.get(next_url).json()
+    assert data['next'] is None
+    assert data['html'].count('<tr>') == 5
+    assert 'Activity 0<' in data['html']
+
+
+@pytest.mark.django_db
+def test_activity_list_view_rejects_bad_input(client, user):
+    client.force_login(user)
+    assert client.get(reverse('activity_list'), {'period': 'decade'}).status_code == 400
+    assert client.get(reverse('activity_list'), {'cursor': 'garbage'}).status_code == 400
@@ -0,0 +1,120 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Sum
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from activity_tracker import pagination, utils
+from activity_tracker.dashboard import aget_dashboard_data
+from activity_tracker.expenses import SORTS, filter_expenses
+from activity_tracker.models import Activity, ActivityRollup, Expense, ExpenseRollup
+
+# EXPLAIN output is only meaningful against the production database engine
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(connection.vendor != 'postgresql', reason="query plans are PostgreSQL specific"),
+]
+
+USERS = 20
+ACTIVITIES_PER_USER = 2000
+EXPENSES_PER_USER = 1000
+
+
+@pytest.fixture
+def seeded_user():
+    User = get_user_model()
+    users = User.objects.bulk_create(User(username=f'user{i}') for i in range(USERS))
+    # About three years of history running up to today
+    start = timezone.now() - timedelta(hours=13 * ACTIVITIES_PER_USER)
+    activities = []
+    expenses = []
+    for user in users:
+        for i in range(ACTIVITIES_PER_USER):
+            start_time = start + timedelta(hours=13 * i)
+            activities.append(Activity(
+                user=user,
+                name='Seeded',
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=1),
+                activity_type=Activity.TAGS[i % len(Activity.TAGS)][0],
+            ))
+        for i in range(EXPENSES_PER_USER):
+            day = (start + timedelta(days=i)).date()
+            expenses.append(Expense(
+                user=user,
+                amount=10,
+                category=Expense.TAGS[i % len(Expense.TAGS)][0],
+                date=day,
+            ))
+    Activity.objects.bulk_create(activities, batch_size=5000)
+    Expense.objects.bulk_create(expenses, batch_size=5000)
+    ActivityRollup.rebuild()
+    ExpenseRollup.rebuild()
+    with connection.cursor() as cursor:
+        for model in (Activity, Expense, ActivityRollup, ExpenseRollup):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+    return users[0]
+
+
+def dashboard_queries(user):
+    today = timezone.localdate()
+    day_start, day_end = utils.period_bounds('day')
+    month_start, month_end = utils.period_bounds('month')
+    this_year = today.replace(month=1, day=1)
+    return {
+        'today_activities': (
+            Activity.objects.filter(user=user, start_time__gte=day_start, start_time__lt=day_end)
+            .order_by('-start_time'),
+            'activity_user_start_idx',
+        ),
+        'activity_list_next_page': (
+            Activity.objects.filter(user=user, start_time__gte=month_start, start_time__lt=month_end)
+            .filter(pagination._after(('-start_time', '-id'), [timezone.now() - timedelta(days=3), 10 ** 9]))
+            .order_by('-start_time', '-id')[:pagination.PAGE_SIZE + 1],
+            'activity_user_start_idx',
+        ),
+        'daily_activities': (utils.aggregate_daily_activities(user), 'unique_activity_rollup'),
+        'activities_by_type': (utils.agg_activities_by_type(user, 'month'), 'unique_activity_rollup'),
+        'activity_tag_stats': (
+            ActivityRollup.objects.filter(user=user, day__gte=this_year)
+            .values('activity_type').annotate(activity_count=Sum('activity_count')),
+            'unique_activity_rollup',
+        ),
+        'expenses_page_by_date': (
+            filter_expenses(user).order_by(*SORTS['-date'])[:pagination.PAGE_SIZE + 1],
+            'expense_user_date_idx',
+        ),
+        'expenses_page_by_amount': (
+            filter_expenses(user).order_by(*SORTS['-amount'])[:pagination.PAGE_SIZE + 1],
+            'expense_user_amount_idx',
+        ),
+        'expenses_by_category': (utils.agg_expenses_by_category(user), 'unique_expense_rollup'),
+        'yearly_expense_totals': (
+            Expense.objects.filter(user=user, year=today.year)
+            .values('category').annotate(total_amount=Sum('amount')),
+            'expense_user_year_cat_idx',
+        ),
+    }
+
+
+def test_dashboard_queries_use_indexes(seeded_user):
+    # Seeding is the expensive part, so check every query against one data set
+    failures = {}
+    for name, (queryset, index) in dashboard_queries(seeded_user).items():
+        plan = queryset.explain()
+        if 'Seq Scan' in plan or index not in plan:
+            failures[name] = plan
+
+    # The dashboard data service's statements, as actually executed
+    with CaptureQueriesContext(connection) as queries:
+        async_to_sync(aget_dashboard_data)(seeded_user, 'month')
+    with connection.cursor() as cursor:
+        for number, query in enumerate(queries.captured_queries):
+            cursor.execute('EXPLAIN ' + query['sql'])
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            if 'Seq Scan' in plan:
+                failures[f'dashboard_data[{number}]'] = plan
+    assert not failures, "\n\n".join(f"{name}:\n{plan}" for name, plan in failures.items())
+
@@ -0,0 +1,128 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.http import HttpResponse
+from django.db import connections
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from activity_tracker import routers
+from activity_tracker.chart_cache import get_or_build_chart
+from activity_tracker.models import Activity
+from activity_tracker.routers import ReplicaRouter, use_replica
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica1']
+    return settings.DATABASE_REPLICAS
+
+
+@use_replica
+def read_view(request):
+    # Report where the router would send reads made by the view
+    router = ReplicaRouter()
+    return HttpResponse(f'{router.db_for_read(Activity)},{router.db_for_read(get_user_model())}')
+
+
+def call(method='get', session=None):
+    request = getattr(RequestFactory(), method)('/')
+    request.session = session if session is not None else SessionStore()
+    return read_view(request).content.decode()
+
+
+def test_activity_reads_go_to_replica_inside_replica_views(replicas):
+    assert call() == 'replica1,None'
+    # Outside the view reads stay on the primary
+    assert ReplicaRouter().db_for_read(Activity) is None
+
+
+def test_unsafe_requests_read_from_primary(replicas):
+    assert call('post') == 'None,None'
+
+
+def test_no_replicas_configured(settings):
+    settings.DATABASE_REPLICAS = []
+    assert call() == 'None,None'
+
+
+def test_pinned_session_reads_from_primary_until_window_expires(replicas, settings, monkeypatch):
+    settings.REPLICA_PIN_SECONDS = 10
+    session = SessionStore()
+    request = RequestFactory().post('/')
+    request.session = session
+    routers.pin_to_primary(request)
+    assert call(session=session) == 'None,None'
+
+    now = routers.time.time()
+    monkeypatch.setattr(routers.time, 'time', lambda: now + 11)
+    assert call(session=session) == 'replica1,None'
+
+
+@use_replica
+async def async_read_view(request):
+    router = ReplicaRouter()
+    return HttpResponse(f'{router.db_for_read(Activity)},{router.db_for_read(get_user_model())}')
+
+
+def test_async_views_read_from_replica_unless_pinned(replicas):
+    session = SessionStore()
+    request = RequestFactory().get('/')
+    request.session = session
+    assert async_to_sync(async_read_view)(request).content.decode() == 'replica1,None'
+    routers.pin_to_primary(request)
+    assert async_to_sync(async_read_view)(request).content.decode() == 'None,None'
+    assert ReplicaRouter().db_for_read(Activity) is None
+
+
+@pytest.mark.django_db
+def test_cached_charts_are_built_from_the_primary(replicas):
+    user = get_user_model().objects.create_user(username='testuser', password='uwu2132')
+
+    @use_replica
+    def chart_view(request):
+        build = lambda: str(ReplicaRouter().db_for_read(Activity))
+        return HttpResponse(f'{routers.replica_alias()},{get_or_build_chart(user, "test", build)}')
+
+    request = RequestFactory().get('/')
+    request.session = SessionStore()
+    assert chart_view(request).content.decode() == 'replica1,None'
+
+
+def test_replicas_are_never_migrated(replicas):
+    router = ReplicaRouter()
+    assert router.allow_migrate('replica1', 'activity_tracker') is False
+    assert router.allow_migrate('default', 'activity_tracker') is None
+
+
+@pytest.mark.django_db
+def test_add_activity_pins_session_to_primary(client, replicas):
+    user = get_user_model().objects.create_user(username='testuser', password='uwu2132')
+    client.force_login(user)
+    client.post(reverse('add_activity'), {
+        'name': 'Test Activity',
+        'activity_type': 'work',
+        'start_time': timezone.now().strftime('%Y-%m-%d %H:%M'),
+    })
+    assert Activity.objects.filter(user=user).exists()
+    assert client.session[routers.PINNED_SESSION_KEY] > routers.time.time()
+
+
+
+@pytest.fixture
+def replica_databases():
+    return list(settings.DATABASE_REPLICAS)
+
+
+@pytest.mark.skipif(not settings.DATABASE_REPLICAS, reason="set DB_REPLICA_HOSTS to test real replicas")
+@pytest.mark.django_db(databases='__all__')
+def test_dashboard_reads_hit_a_configured_replica(client, replica_databases, monkeypatch):
+    user = get_user_model().objects.create_user(username='testuser', password='uwu2132')
+    client.force_login(user)
+    monkeypatch.setattr(routers.random, 'choice', lambda aliases: aliases[0])
+    with CaptureQueriesContext(connections[replica_databases[0]]) as queries:
+        assert client.get(reverse('dashboard')).status_code == 200
+    assert queries.captured_queries
@@ -0,0 +1,65 @@
+import json
+import os
+import runpy
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+from django.conf import settings
+
+# Wall time allowed for a fresh interpreter to run django.setup() and resolve
+# the main URLs. Override with STARTUP_BUDGET_SECONDS on slow machines.
+STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 2.0))
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import resolve
+for path in ('/', '/home/', '/dashboard/', '/dashboard/day/', '/dashboard/week/', '/dashboard/month/'):
+    resolve(path)
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'heavy_modules': [name for name in ('plotly', 'pandas', 'numpy') if name in sys.modules],
+}))
+"""
+
+
+def measure_startup():
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT],
+        cwd=settings.BASE_DIR,
+        env={'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, **os.environ},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_startup_does_not_import_charting_stack():
+    assert measure_startup()['heavy_modules'] == []
+
+
+def test_startup_within_budget():
+    # Best of three to keep the benchmark stable on a busy machine
+    seconds = min(measure_startup()['seconds'] for _ in range(3))
+    assert seconds < STARTUP_BUDGET_SECONDS, (
+        f"django.setup() + URL resolution took {seconds:.2f}s, "
+        f"budget is {STARTUP_BUDGET_SECONDS:.2f}s"
+    )
+
+
+def test_gunicorn_refuses_several_workers_with_a_per_process_cache(settings):
+    config = runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+    assert config['cpus'] <= len(os.sched_getaffinity(0))
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(workers=1)))
+    with pytest.raises(RuntimeError, match='CACHE_URL'):
+        config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(workers=2)))
+
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                   'LOCATION': 'redis://redis:6379/1'}}
+    config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(workers=2)))
@@ -0,0 +1,59 @@
+import pytest
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+
+
+@pytest.fixture
+def collected(settings, tmp_path):
+    source = tmp_path / 'static'
+    (source / 'css').mkdir(parents=True)
+    (source / 'css' / 'site.css').write_text('body { color: #333; }\n' * 100)
+    settings.STATICFILES_DIRS = [source]
+    settings.STATICFILES_FINDERS = ['django.contrib.staticfiles.finders.FileSystemFinder']
+    settings.STATIC_ROOT = tmp_path / 'root'
+    call_command('collectstatic', interactive=False, verbosity=0)
+    return settings.STATIC_ROOT
+
+
+def test_collectstatic_writes_hashed_and_compressed_copies(collected):
+    hashed = staticfiles_storage.stored_name('css/site.css')
+    assert hashed != 'css/site.css'
+    for suffix in ('', '.gz', '.br'):
+        assert (collected / f'{hashed}{suffix}').exists()
+    # Files missing from the manifest keep their plain name
+    assert staticfiles_storage.stored_name('css/missing.css') == 'css/missing.css'
+
+
+def test_hashed_assets_are_served_compressed_and_cached_for_good(client, collected):
+    url = staticfiles_storage.url('css/site.css')
+    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+    assert response.status_code == 200
+    assert response['Content-Encoding'] == 'br'
+    assert 'immutable' in response['Cache-Control']
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+
+
+def test_static_files_stream_over_asgi(async_client, collected):
+    from asgiref.sync import async_to_sync
+
+    url = staticfiles_storage.url('css/site.css')
+    response = async_to_sync(async_client.get)(url, HTTP_ACCEPT_ENCODING='identity')
+    assert response.status_code == 200
+    # Read block by block as the server sends it, not into memory first
+    assert response.is_async
+
+    async def read():
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    assert async_to_sync(read)() == (collected / staticfiles_storage.stored_name('css/site.css')).read_bytes()
+
+
+def test_asgi_handler_runs_no_middleware_in_a_thread(settings, caplog):
+    from django.core.handlers.asgi import ASGIHandler
+
+    settings.DEBUG = True
+    with caplog.at_level('DEBUG', logger='django.request'):
+        ASGIHandler()
+    assert not [record for record in caplog.records if 'adapted for middleware' in record.getMessage()]
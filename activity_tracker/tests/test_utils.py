@@ -0,0 +1,93 @@
+import pytest
+import zoneinfo
+from datetime import date, datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from activity_tracker import utils
+from activity_tracker.apps import ActivityTrackerConfig
+from activity_tracker.models import Activity, ActivityRollup
+
+
+@pytest.mark.django_db
+def test_columns_returns_one_list_per_field():
+    user = get_user_model().objects.create(username='testuser')
+    for day in (1, 2):
+        Activity.objects.create(
+            user=user,
+            name='Test Activity',
+            start_time=datetime(2023, 10, day, 10, 0, 0),
+            logged_duration=timedelta(minutes=90),
+        )
+    data = utils.columns(utils.aggregate_daily_activities(user), 'day', 'total_duration', 'activity_count')
+    assert data == {
+        'day': [date(2023, 10, 1), date(2023, 10, 2)],
+        'total_duration': [timedelta(minutes=90)] * 2,
+        'activity_count': [1, 1],
+    }
+    assert utils.to_hours(data['total_duration'] + [None]) == [1.5, 1.5, 0]
+    assert utils.columns(ActivityRollup.objects.none(), 'day') == {'day': []}
+
+
+@pytest.mark.django_db
+def test_charts_render_without_data():
+    user = get_user_model().objects.create(username='testuser')
+    assert 'Daily Activity Duration' in utils.create_daily_activities_chart(user)
+    assert 'Activities by Type this Week' in utils.create_activities_by_type_chart(user, 'week')
+    assert 'No data' in utils.create_expenses_tree_chart(user)
+
+
+@pytest.fixture
+def demo_builds(monkeypatch):
+    builds = []
+    monkeypatch.setattr(utils, '_demo_charts', {})
+    monkeypatch.setattr(utils, 'create_demo_bar_chart', lambda today: builds.append(today) or f'bar {today}')
+    monkeypatch.setattr(utils, 'create_demo_pie_chart', lambda: 'pie')
+    monkeypatch.setattr(utils, 'create_demo_tree_chart', lambda: 'tree')
+    return builds
+
+
+def test_demo_charts_are_rendered_once_per_day(demo_builds, monkeypatch):
+    monkeypatch.setattr(timezone, 'localdate', lambda: date(2024, 5, 1))
+    first = utils.get_demo_charts()
+    assert utils.get_demo_charts() == first
+    assert demo_builds == [date(2024, 5, 1)]
+    assert first == {
+        'demo_bar_chart_div': 'bar 2024-05-01',
+        'demo_pie_chart_div': 'pie',
+        'demo_tree_chart_div': 'tree',
+    }
+
+    monkeypatch.setattr(timezone, 'localdate', lambda: date(2024, 5, 2))
+    assert utils.get_demo_charts()['demo_bar_chart_div'] == 'bar 2024-05-02'
+    assert len(demo_builds) == 2
+
+
+def test_app_ready_warms_demo_charts(demo_builds, settings):
+    import activity_tracker
+    app_config = ActivityTrackerConfig('activity_tracker', activity_tracker)
+    settings.WARM_DEMO_CHARTS = False
+    app_config.ready()
+    assert demo_builds == []
+    settings.WARM_DEMO_CHARTS = True
+    app_config.ready()
+    assert len(demo_builds) == 1
+
+
+@pytest.mark.parametrize('period, start, end', [
+    ('day', date(2024, 2, 29), date(2024, 3, 1)),
+    ('week', date(2024, 2, 26), date(2024, 3, 4)),
+    ('month', date(2024, 2, 1), date(2024, 3, 1)),
+    ('year', date(2024, 1, 1), date(2025, 1, 1)),
+])
+def test_period_dates(period, start, end):
+    assert utils.period_dates(period, date(2024, 2, 29)) == (start, end)
+
+
+def test_period_bounds_are_aware_in_active_timezone():
+    tz = zoneinfo.ZoneInfo('America/New_York')
+    with timezone.override(tz):
+        start, end = utils.period_bounds('day', date(2024, 3, 10))
+    assert start == datetime(2024, 3, 10, tzinfo=tz)
+    # DST starts that day, so the local day is only 23 hours long
+    utc = zoneinfo.ZoneInfo('UTC')
+    assert end.astimezone(utc) - start.astimezone(utc) == timedelta(hours=23)
@@ -1,14 +1,14 @@
 import pytest
 from django.urls import reverse
+from activity_tracker import views
 from activity_tracker.views import home_view, sign_up, login_view, logout_view
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
-@pytest.fixture
-def user(db):
-    User = get_user_model()
-    return User.objects.create_user(username='testuser', password='uwu2132')
-    
 @pytest.mark.django_db    
 def test_base_view_redirecting_to_home_view(client):
     response = client.get(reverse('base'))
@@ -56,6 +56,13 @@ def test_home_view_rendering(client):
     assert 'demo_bar_chart_div' in response.context
     assert 'demo_pie_chart_div' in response.context
     assert 'demo_tree_chart_div' in response.context
+
+@pytest.mark.django_db
+def test_home_view_loads_plotly_js_once_from_static(client):
+    response = client.get(reverse('home'))
+    assert response.content.count(b'plotly/plotly.min') == 1
+    # The bundle itself must not be inlined next to every chart
+    assert len(response.content) < 1024 * 1024
     
 @pytest.mark.django_db
 def test_sign_up_view_get_request(client):
@@ -162,13 +169,16 @@ def test_dashboard_view_context(client, user):
     assert hasattr(response.context['form'], 'is_valid')
 
 @pytest.mark.django_db
-def test_dashboard_view_creates_daily_activity_if_none_exists(client, user):
+def test_dashboard_view_renders_empty_day_without_writing(client, user):
     client.force_login(user)
-    response = client.get(reverse('dashboard'))
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('dashboard'))
     assert response.status_code == 200
-    assert user.activity_set.filter(name='Hello', activity_type='Daily visit').exists()
-    activity = user.activity_set.get(name='Hello', activity_type='Daily visit')
-    assert activity.description == "Thank you for visiting our site today"
+    # Read only, so the page can be served from a replica
+    assert all(query['sql'].startswith('SELECT') for query in queries.captured_queries)
+    assert not user.activity_set.exists()
+    assert response.context['today_activities'] == []
+    assert b'Nothing logged today yet' in response.content
    
 @pytest.mark.django_db
 def test_dashboard_view_expenses_placeholder_in_context(client, user):
@@ -185,4 +195,99 @@ def test_dashboard_view_expenses_placeholder_in_context(client, user):
 @pytest.mark.django_db
 def test_dashboard_view_requires_login(client):
     response = client.get(reverse('dashboard'))
-    assert response.status_code == 302  
\ No newline at end of file
+    assert response.status_code == 302  
+
+@pytest.mark.django_db
+def test_chart_data_view_returns_figure_json(client, user):
+    client.force_login(user)
+    response = client.get(reverse('chart_data', args=['activities-by-type']), {'period': 'week'})
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/json'
+    figure = response.json()
+    assert figure['data'][0]['type'] == 'pie'
+    assert 'ETag' in response
+
+
+@pytest.mark.django_db
+def test_chart_data_view_not_modified_when_data_unchanged(client, user, monkeypatch):
+    client.force_login(user)
+    url = reverse('chart_data', args=['daily-activities'])
+    etag = client.get(url)['ETag']
+
+    def fail(*args, **kwargs):
+        raise AssertionError("aggregation should be skipped on a matching ETag")
+
+    monkeypatch.setitem(views.CHART_FIGURES, 'daily-activities', fail)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_chart_data_view_rejects_unknown_chart_and_period(client, user):
+    client.force_login(user)
+    assert client.get(reverse('chart_data', args=['nope'])).status_code == 404
+    response = client.get(reverse('chart_data', args=['activities-by-type']), {'period': 'decade'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_dashboard_view_rejects_unknown_period(client, user):
+    client.force_login(user)
+    response = client.get(reverse('dashboard'), {'period': 'bogus'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_dashboard_view_async_charts_renders_placeholders(client, user, settings):
+    settings.DASHBOARD_ASYNC_CHARTS = True
+    client.force_login(user)
+    response = client.get(reverse('dashboard'), {'period': 'month'})
+    assert response.status_code == 200
+    assert response.content.count(b'data-chart-url=') == 3
+    assert b'activities-by-type/?period=month' in response.content
+
+
+@pytest.mark.django_db
+def test_dashboard_day_view_uses_the_users_timezone(client, user):
+    from django.core.cache import cache
+    from activity_tracker.models import Activity, Profile
+    import zoneinfo
+    cache.clear()
+    Profile.objects.create(user=user, timezone='Pacific/Kiritimati')  # UTC+14
+    tz = zoneinfo.ZoneInfo('Pacific/Kiritimati')
+    local_midnight = timezone.localtime(timezone.now(), tz).replace(hour=0, minute=30)
+    Activity.objects.create(user=user, name='Local Morning', activity_type='work', start_time=local_midnight)
+    Activity.objects.create(
+        user=user, name='Local Yesterday', activity_type='work', start_time=local_midnight - timedelta(hours=1)
+    )
+    client.force_login(user)
+    response = client.get(reverse('dashboard_day'))
+    names = [activity.name for activity in response.context['today_activities']]
+    assert names == ['Local Morning']
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_period_dashboards_served_over_asgi_use_the_users_timezone(async_client, user):
+    from asgiref.sync import async_to_sync
+    from django.core.cache import cache
+    from activity_tracker.models import Activity, Profile
+    import zoneinfo
+    cache.clear()
+    Profile.objects.create(user=user, timezone='Pacific/Kiritimati')  # UTC+14
+    tz = zoneinfo.ZoneInfo('Pacific/Kiritimati')
+    local_midnight = timezone.localtime(timezone.now(), tz).replace(hour=0, minute=30)
+    Activity.objects.create(user=user, name='Local Morning', activity_type='work', start_time=local_midnight)
+    async_client.force_login(user)
+    # AsyncClient goes through ASGIHandler, so the async middleware path runs
+    response = async_to_sync(async_client.get)(reverse('dashboard_day'))
+    assert [activity.name for activity in response.context['today_activities']] == ['Local Morning']
+    assert 'chart-activities-by-type' in response['Server-Timing']
+    for name in ('dashboard', 'dashboard_week', 'dashboard_month'):
+        assert async_to_sync(async_client.get)(reverse(name)).status_code == 200
+    response = async_to_sync(async_client.get)(reverse('chart_data', args=['daily-activities']))
+    assert response.status_code == 200
+    response = async_to_sync(async_client.get)(
+        reverse('chart_data', args=['daily-activities']), headers={'if-none-match': response['ETag']})
+    assert response.status_code == 304
+    cache.clear()
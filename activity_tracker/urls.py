@@ -28,11 +28,17 @@ urlpatterns = [
     path('login/', views.login_view.as_view(), name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('add-activity/', views.add_activity, name='add_activity'),
+    path('import/', views.import_activities_view, name='import_activities'),
+    path('export/activities/', views.export_activities_view, name='export_activities'),
+    path('export/expenses/', views.export_expenses_view, name='export_expenses'),
     path('expenses/', views.expenses_view, name='expenses'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('dashboard/day/', views.dashboard_day_view, name='dashboard_day'),
     path('dashboard/week/', views.dashboard_week_view, name='dashboard_week'),
     path('dashboard/month/', views.dashboard_month_view, name='dashboard_month'),
+    path('dashboard/activities/', views.activity_list_view, name='activity_list'),
+    path('dashboard/charts/<slug:kind>/', views.chart_data_view, name='chart_data'),
+    path('dashboard/cache-stats/', views.chart_cache_stats_view, name='chart_cache_stats'),
 ]
 
 
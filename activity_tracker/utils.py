@@ -1,113 +1,238 @@
-from datetime import timedelta
+import threading
+from datetime import datetime, time, timedelta
 from django.utils import timezone
-import plotly.express as px
-import plotly.offline as opy
-import pandas as pd
-from django.db.models import Count, Sum, DurationField
-from django.db.models.functions import TruncDate, TruncDay, TruncWeek, TruncMonth, TruncYear
-from .models import Activity, Expense
+from django.utils.html import format_html
+from django.db.models import Sum, DurationField
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncYear
+from .models import ActivityRollup, ExpenseRollup
 from .forms import ActivityForm, ExpenseInlineForm
 
+
+# plotly is imported inside the chart helpers rather than at module level so
+# that workers, management commands and tests only pay for it on first render
+
+
+def render_chart_div(fig):
+    import plotly.offline as opy
+
+    # Emit only the container and figure JSON; plotly.js itself is loaded
+    # once from static files by base.html
+    return opy.plot(fig, output_type='div', include_plotlyjs=False)
+
+
+def warm_up_charting():
+    """
+    Import plotly and numpy, which plotly loads (when installed) the first
+    time a chart needs it. Those first imports are not safe to run from
+    several threads at once.
+    """
+    import plotly.graph_objects  # noqa: F401
+    import plotly.offline  # noqa: F401
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        pass
+
+
+def chart_placeholder_div(url):
+    # Empty container filled in by static/js/charts.js from a chart_data endpoint
+    return format_html('<div class="chart-placeholder" data-chart-url="{}"></div>', url)
+
+
+def columns(queryset, *fields):
+    """
+    Fetch ``fields`` with a single ``values_list`` query and return them
+    column-wise, e.g. ``{'day': [...], 'activity_count': [...]}``.
+    """
+    rows = list(queryset.values_list(*fields))
+    if not rows:
+        return {field: [] for field in fields}
+    return dict(zip(fields, map(list, zip(*rows))))
+
+
+def to_hours(durations):
+    return [duration.total_seconds() / 3600 if duration else 0 for duration in durations]
+
+
+def bar_figure(x, y, color, title, labels):
+    import plotly.graph_objects as go
+
+    x_label, y_label, color_label = labels
+    fig = go.Figure(go.Bar(
+        x=x,
+        y=y,
+        marker=dict(color=color, coloraxis='coloraxis'),
+        hovertemplate=f'{x_label}=%{{x}}<br>{y_label}=%{{y}}<br>{color_label}=%{{marker.color}}<extra></extra>',
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_label,
+        yaxis_title=y_label,
+        coloraxis_colorbar=dict(title=color_label),
+    )
+    return fig
+
+
+def pie_figure(names, values, title, labels):
+    import plotly.graph_objects as go
+
+    name_label, value_label = labels
+    fig = go.Figure(go.Pie(
+        labels=names,
+        values=values,
+        hovertemplate=f'{name_label}=%{{label}}<br>{value_label}=%{{value}}<extra></extra>',
+    ))
+    fig.update_layout(title=title)
+    return fig
+
+
+def treemap_figure(names, values, title):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Treemap(
+        labels=names,
+        parents=[''] * len(names),
+        values=values,
+        branchvalues='total',
+        textinfo="label+value+percent entry",
+        textfont=dict(size=15),
+        hovertemplate="<b>%{label}</b><br>Amount: %{value}<br>Percent: %{percentEntry:.2%}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=title,
+        margin=dict(t=40, l=0, r=0, b=0),
+    )
+    return fig
+
+
 def aggregate_daily_activities(user):
-    daily_activities = Activity.objects.filter(user=user).annotate(
-        day=TruncDate('start_time')
-    ).values('day').annotate(
-        activity_count=Count('id'),
-        total_duration=Sum('duration', output_field=DurationField())
-    ).order_by('day')
+    daily_activities = ActivityRollup.objects.filter(user=user) \
+        .values('day') \
+        .annotate(
+            activity_count=Sum('activity_count'),
+            total_duration=Sum('total_duration', output_field=DurationField())
+        ).order_by('day')
     
     return daily_activities
 
 
-def create_daily_activities_chart(user):
-    daily_activities = aggregate_daily_activities(user)
-    
-    df = pd.DataFrame(daily_activities)
-    
-    # Convert duration to minutes for better visualization
-    df['total_duration_hours'] = df['total_duration'].apply(lambda x: x.total_seconds() / 60 / 60 if x else 0)
-    
-    # Create plotly figure
-    fig = px.bar(
-        df, 
-        x='day', 
-        y='total_duration_hours', 
-        color='activity_count',
+def daily_activities_figure(user):
+    data = columns(aggregate_daily_activities(user), 'day', 'total_duration', 'activity_count')
+
+    # Convert duration to hours for better visualization
+    fig = bar_figure(
+        data['day'],
+        to_hours(data['total_duration']),
+        data['activity_count'],
         title='Daily Activity Duration',
-        labels={
-            'day': 'Date', 
-            'total_duration_hours': 'Total Duration (hours)',
-            'activity_count': 'Number of Activities'
-        }
+        labels=('Date', 'Total Duration (hours)', 'Number of Activities'),
     )
-    
+    return fig
+
+
+def create_daily_activities_chart(user):
     # Convert to div
-    chart_div = opy.plot(fig, output_type='div', include_plotlyjs=True)
+    chart_div = render_chart_div(daily_activities_figure(user))
     return chart_div
 
+
+PERIODS = ('day', 'week', 'month', 'year')
+
+
+def period_dates(period, today=None):
+    """
+    First day of the current day/week/month/year and the first day after it,
+    in the active time zone.
+    """
+    today = today or timezone.localdate()
+    if period == 'day':
+        start = today
+        end = start + timedelta(days=1)
+    elif period == 'week':
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=7)
+    elif period == 'month':
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+    elif period == 'year':
+        start = today.replace(month=1, day=1)
+        end = start.replace(year=start.year + 1)
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    return start, end
+
+
+def period_bounds(period, today=None):
+    """
+    ``[start, end)`` aware datetimes of the current period in the active time
+    zone, for index-friendly ``start_time__gte``/``start_time__lt`` filters.
+    """
+    tz = timezone.get_current_timezone()
+    return tuple(
+        timezone.make_aware(datetime.combine(day, time.min), tz)
+        for day in period_dates(period, today)
+    )
+
+
 def agg_activities_by_type(user, period):
-    now = timezone.now()
+    start, end = period_dates(period)
     trunc_map = {
-        'day': TruncDay('start_time'),
-        'week': TruncWeek('start_time'),
-        'month': TruncMonth('start_time'),
-        'year': TruncYear('start_time')
+        'day': TruncDay('day'),
+        'week': TruncWeek('day'),
+        'month': TruncMonth('day'),
+        'year': TruncYear('day')
     }
 
-    date_filters = {
-        'day': now.date(),
-        'week': now.date() - timedelta(days=now.weekday()),
-        'month': now.replace(day=1).date(),
-        'year': now.replace(month=1, day=1).date()
-    }
-    
-    return (Activity.objects.filter(
+    return (ActivityRollup.objects.filter(
             user=user,
-            start_time__date__gte=date_filters[period]
+            day__gte=start,
+            day__lt=end
         )
         .annotate(period=trunc_map[period])
         .values('activity_type', 'period')
-        .annotate(activity_count=Count('id'))
+        .annotate(activity_count=Sum('activity_count'))
         .order_by('period', 'activity_type'))
 
-def create_activities_by_type_chart(user,period):
-    df = pd.DataFrame(agg_activities_by_type(user, period))
-    fig = px.pie(df,
-                values='activity_count',
-                names='activity_type',
-                title=f'Activities by Type this {period.title()}',
-                labels={'activity_type': 'Activity Type', 'activity_count': 'Number of Activities'},)
-    chart_div = opy.plot(fig, output_type='div', include_plotlyjs=True)
+def activities_by_type_figure(user, period, data=None):
+    if data is None:
+        data = columns(agg_activities_by_type(user, period), 'activity_type', 'activity_count')
+    fig = pie_figure(
+        data['activity_type'],
+        data['activity_count'],
+        title=f'Activities by Type this {period.title()}',
+        labels=('Activity Type', 'Number of Activities'),
+    )
+    return fig
+
+
+def create_activities_by_type_chart(user, period, data=None):
+    chart_div = render_chart_div(activities_by_type_figure(user, period, data))
     return chart_div
 
 
 
 def agg_expenses_by_category(user):
-    expenses = Expense.objects.filter(user=user)
-    return expenses.values('category').annotate(total_amount=Sum('amount'))
+    expenses = ExpenseRollup.objects.filter(user=user)
+    return expenses.values('category').annotate(total_amount=Sum('total_amount')).order_by('category')
 
 
-def create_expenses_tree_chart(user):
-    data = pd.DataFrame(agg_expenses_by_category(user))
-    if data.empty:
+def expenses_tree_figure(user, data=None):
+    if data is None:
+        data = columns(agg_expenses_by_category(user), 'category', 'total_amount')
+    if not data['category']:
         # Provide a placeholder row if there are no expenses
-        data = pd.DataFrame([{"category": "No data", "total_amount": 0}])
-        
-    fig = px.treemap(
-        data,
-        path=["category"],
-        values="total_amount",
-        title="Your Spending Breakdown by Category"
-    )
-    fig.update_layout(
-        margin=dict(t=40, l=0, r=0, b=0),
-    )
-    fig.update_traces(
-        textinfo="label+value+percent entry",
-        textfont=dict(size=15),
-        hovertemplate="<b>%{label}</b><br>Amount: %{value}<br>Percent: %{percentEntry:.2%}<extra></extra>"
+        data = {'category': ['No data'], 'total_amount': [0]}
+
+    fig = treemap_figure(
+        data['category'],
+        data['total_amount'],
+        title="Your Spending Breakdown by Category",
     )
-    return opy.plot(fig, output_type='div', include_plotlyjs=True)
+    return fig
+
+
+def create_expenses_tree_chart(user, data=None):
+    return render_chart_div(expenses_tree_figure(user, data))
 
 
 # Todo
@@ -116,81 +241,76 @@ def create_expenses_tree_chart(user):
 # chart_month = create_activities_by_type_chart(user, 'month')
 
 
-def create_demo_bar_chart():
-    data = {
-            'day': [(timezone.now().date() - timedelta(days=i)).isoformat() for i in range(6, -1, -1)],
-            'total_duration': [
-                timedelta(hours=1.5),
-                timedelta(hours=2),
-                timedelta(hours=1),
-                timedelta(hours=3),
-                timedelta(hours=2.5),
-                timedelta(hours=1.75),
-                timedelta(hours=2.25)
-            ],
-            'activity_count': [1, 2, 1, 3, 2, 5, 2]
-        }
-    df = pd.DataFrame(data)
-    df['total_duration_hours'] = df['total_duration'].apply(lambda x: x.total_seconds() / 3600)
-
-    fig = px.bar(
-        df,
-        x='day',
-        y='total_duration_hours',
-        color='activity_count',
+def create_demo_bar_chart(today=None):
+    today = today or timezone.localdate()
+    days = [(today - timedelta(days=i)).isoformat() for i in range(6, -1, -1)]
+    total_duration = [
+        timedelta(hours=1.5),
+        timedelta(hours=2),
+        timedelta(hours=1),
+        timedelta(hours=3),
+        timedelta(hours=2.5),
+        timedelta(hours=1.75),
+        timedelta(hours=2.25)
+    ]
+    activity_count = [1, 2, 1, 3, 2, 5, 2]
+
+    fig = bar_figure(
+        days,
+        to_hours(total_duration),
+        activity_count,
         title='Your weekly Activities',
-        labels={
-            'day': 'Date', 
-            'total_duration_hours': 'Total Duration (hours)',
-            'activity_count': 'Number of Activities'
-        }
+        labels=('Date', 'Total Duration (hours)', 'Number of Activities'),
     )
-    return opy.plot(fig, output_type='div', include_plotlyjs=True)
+    return render_chart_div(fig)
 
 
 
 def create_demo_pie_chart():
-    data = {
-            'activity_type': ['Running', 'Cycling', 'Swimming', 'Yoga'],
-            'activity_count': [10, 5, 8, 12]
-        }
-    df = pd.DataFrame(data)
-    
-    fig = px.pie(df,
-                values='activity_count',
-                names='activity_type',
-                title=f'Your activities by Type',
-                labels={'activity_type': 'Activity Type', 'activity_count': 'Number of Activities'},)
+    fig = pie_figure(
+        ['Running', 'Cycling', 'Swimming', 'Yoga'],
+        [10, 5, 8, 12],
+        title='Your activities by Type',
+        labels=('Activity Type', 'Number of Activities'),
+    )
     fig.update_layout(
     paper_bgcolor='rgba(0,0,0,0)',
     plot_bgcolor='rgba(0,0,0,0)'
     ) 
 
-    return opy.plot(fig, output_type='div', include_plotlyjs=True)
+    return render_chart_div(fig)
 
 
 def create_demo_tree_chart():
-    data = pd.DataFrame({
-        "Category": ["Food", "Transport", "Entertainment", "Bills", "Shopping", "Other"],
-        "Amount": [250, 120, 90, 180, 130, 60]
-    })
-
-    fig = px.treemap(
-        data,
-        path=["Category"],
-        values="Amount",
-        title="Your Spending Breakdown by Category"
-    )
-    fig.update_layout(
-        margin=dict(t=40, l=0, r=0, b=0),
-    )
-    fig.update_traces(
-        textinfo="label+value+percent entry",
-        textfont=dict(size=15),
-        hovertemplate="<b>%{label}</b><br>Amount: %{value}<br>Percent: %{percentEntry:.2%}<extra></extra>"
+    fig = treemap_figure(
+        ["Food", "Transport", "Entertainment", "Bills", "Shopping", "Other"],
+        [250, 120, 90, 180, 130, 60],
+        title="Your Spending Breakdown by Category",
     )
 
-    return opy.plot(fig, output_type='div', include_plotlyjs=True)
+    return render_chart_div(fig)
+
+_demo_charts = {}
+_demo_charts_lock = threading.Lock()
+
+
+def get_demo_charts():
+    """
+    Landing page demo charts, rendered once per process and kept until the
+    date changes (the bar chart is relative to today).
+    """
+    today = timezone.localdate()
+    with _demo_charts_lock:
+        if _demo_charts.get('day') != today:
+            _demo_charts.clear()
+            _demo_charts.update({
+                'day': today,
+                'demo_bar_chart_div': create_demo_bar_chart(today),
+                'demo_pie_chart_div': create_demo_pie_chart(),
+                'demo_tree_chart_div': create_demo_tree_chart(),
+            })
+        return {key: value for key, value in _demo_charts.items() if key != 'day'}
+
 
 def get_dashboard_forms():
     return {
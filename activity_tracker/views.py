@@ -1,17 +1,37 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
-from .forms import UserRegistrationForm, ActivityForm, ExpenseInlineForm, ExpenseForm
+from .forms import UserRegistrationForm, ActivityForm, ExpenseInlineForm, ExpenseForm, ExportForm, ExpenseFilterForm
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Sum, Count
 from .models import Activity, Expense
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.views import LoginView
 from django.urls import reverse_lazy
 from django.contrib import messages
-from .utils import create_daily_activities_chart, create_activities_by_type_chart, create_demo_pie_chart, create_demo_bar_chart, create_demo_tree_chart
-from .utils import create_expenses_tree_chart, get_dashboard_forms
-from datetime import date
+from .utils import create_daily_activities_chart, create_activities_by_type_chart, get_demo_charts
+from .utils import create_expenses_tree_chart, get_dashboard_forms, chart_placeholder_div
+from .utils import PERIODS, daily_activities_figure, activities_by_type_figure, expenses_tree_figure
+from .dashboard import aactivity_list_page, aget_dashboard_data, alist, period_type_totals, today_activities
+from .pagination import InvalidCursor, Page
+from .expenses import expense_page, expense_totals, filter_expenses
+from .exporters import ACTIVITY_FIELDS, EXPENSE_FIELDS, activity_rows, astream_export, expense_rows, stream_export
+from .importers import FORMATS as IMPORT_FORMATS, decode_lines, format_for, import_activities
+from .routers import pin_to_primary, replica_alias, use_replica
+from .chart_cache import get_or_build_chart, chart_cache_stats, get_data_version
+from .chart_pool import acollect_charts, server_timing, submit_charts
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_POST
+from django.utils.cache import get_conditional_response
+from asgiref.sync import sync_to_async
+from functools import partial
+import asyncio
 
 # def base_view(request):
 #     return render(request, 'activity_tracker/base.html', {
@@ -23,15 +43,9 @@ def base_view(request):
     return redirect('home')
     
 def home_view(request):
-    demo_bar_chart_div = create_demo_bar_chart()
-    demo_pie_chart_div = create_demo_pie_chart()
-    demo_tree_chart_div = create_demo_tree_chart()
     context = {
     **get_dashboard_forms(),
-    'demo_bar_chart_div': demo_bar_chart_div,
-    'demo_pie_chart_div': demo_pie_chart_div,
-    'demo_tree_chart_div': demo_tree_chart_div,
-    
+    **get_demo_charts(),
     }
     return render(request, 'activity_tracker/home.html', context)
 
@@ -72,6 +86,7 @@ def add_activity(request):
                 activity = activity_form.save(commit=False)
                 activity.user = request.user  
                 activity.save()
+                pin_to_primary(request)
                 
                 if request.POST.get("add_expense"):
                     if expense_form.has_changed() and expense_form.is_valid():
@@ -94,172 +109,279 @@ def add_activity(request):
     
 
 @login_required
-def dashboard_view(request):
-    # Get yearly activities
+@require_POST
+def import_activities_view(request):
+    """Upload a CSV or JSON lines file of activities; responds with the import report."""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return HttpResponseBadRequest("No file uploaded")
+    fmt = request.POST.get('format') or format_for(upload.name)
+    if fmt not in IMPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown format")
+    # Decode the (possibly disk-backed) upload line by line instead of reading it whole
+    result = import_activities(request.user, decode_lines(upload.file), fmt)
+    pin_to_primary(request)
+    return JsonResponse(result.as_dict())
+
+
+arender = sync_to_async(render)
+
+
+def _activities_by_type_placeholder(period):
+    return chart_placeholder_div(
+        reverse('chart_data', args=['activities-by-type']) + '?' + urlencode({'period': period}))
+
+
+def _primary_data(data):
+    # Cached charts are only built from data read on the primary; without
+    # it the chart builder queries the primary itself
+    return None if replica_alias() else data
+
+
+@login_required
+@use_replica
+async def dashboard_view(request):
     period = request.GET.get('period', 'year')
-    today = timezone.now().date()
-    this_year = timezone.now().date().replace(month=1, day=1)
-    today_activities = Activity.objects.filter(
-        user=request.user, 
-        start_time__date=today
-    ).order_by('-start_time')
-    
-    # Create a default activity if none exist
-    if not today_activities.exists():
-        Activity.objects.create(
-            user=request.user,
-            name='Hello',
-            activity_type='Daily visit',
-            start_time=timezone.now(),
-            description="Thank you for visiting our site today"
-        )
-        today_activities = Activity.objects.filter(
-            user=request.user, 
-            start_time__date=today
-        ).order_by('-start_time')
-    
-    
-    
-    # Tag-based statistics for the whole year
-    activity_tag_stats = Activity.objects.filter(
-        user=request.user, 
-        start_time__date__gte=this_year
-    ).values('activity_type') \
-     .annotate(
-         total_duration=Sum('duration'),
-         activity_count=Count('id')
-     )
-     
-    expenses = Expense.objects.filter(
-        user=request.user,
-        year=date.today().year,
-    )
-    expenses_tag_stats = expenses.values('category') \
-        .annotate(
-            total_amount=Sum('amount'),
-            expenses_count=Count('id')
-        )
+    if period not in PERIODS:
+        return HttpResponseBadRequest("Unknown period")
+    user = await request.auser()
 
-    if not expenses.exists():
+    # Charts the browser fetches from chart_data_view: the whole page in
+    # async mode, otherwise the fallback for charts that time out
+    placeholders = {
+        'daily_activities': chart_placeholder_div(reverse('chart_data', args=['daily-activities'])),
+        'activities_by_type': _activities_by_type_placeholder(period),
+        'expenses_tree': chart_placeholder_div(reverse('chart_data', args=['expenses-by-category'])),
+    }
+    timings = {}
+    if settings.DASHBOARD_ASYNC_CHARTS:
+        charts = placeholders
+        data = await aget_dashboard_data(user, period)
+    else:
+        # The daily chart runs its own query, so start it before loading the
+        # rest; the other two are built from the dashboard data
+        pending = await sync_to_async(submit_charts)({
+            'daily_activities': partial(
+                get_or_build_chart, user, 'daily_activities',
+                partial(create_daily_activities_chart, user),
+            ),
+        })
+        # Today's list and every yearly/period aggregate in three queries,
+        # shared by the template and the chart builders
+        data = await aget_dashboard_data(user, period)
+        pending.update(await sync_to_async(submit_charts)({
+            'activities_by_type': partial(
+                get_or_build_chart, user, 'activities_by_type',
+                partial(create_activities_by_type_chart, user, period, _primary_data(data.activities_by_type)),
+                period=period,
+            ),
+            'expenses_tree': partial(
+                get_or_build_chart, user, 'expenses_tree',
+                partial(create_expenses_tree_chart, user, _primary_data(data.expenses_by_category)),
+            ),
+        }))
+        charts, timings = await acollect_charts(pending, placeholders)
+
+    expenses_tag_stats = data.expenses_tag_stats
+    if not data.has_expenses:
         expenses_tag_stats = [{
             'category': 'No data',
             'total_amount': 0,
             'expenses_count': 0,
         }]
 
-    daily_activities_chart = create_daily_activities_chart(request.user)
-    activities_by_type_chart = create_activities_by_type_chart(request.user, period)
-    expenses_tree_chart = create_expenses_tree_chart(request.user)
-
-    
     context = {
-        'today_activities': today_activities,
-        'activity_tag_stats': activity_tag_stats,
+        'today_activities': data.today_activities,
+        'activity_tag_stats': data.activity_tag_stats,
         'expenses_tag_stats': expenses_tag_stats,
-        'daily_activities_chart': daily_activities_chart,
-        'activities_by_type_chart': activities_by_type_chart,
-        'expenses_tree_chart': expenses_tree_chart,
+        'daily_activities_chart': charts['daily_activities'],
+        'activities_by_type_chart': charts['activities_by_type'],
+        'expenses_tree_chart': charts['expenses_tree'],
         'selected_period': period,
         **get_dashboard_forms(),
     }
-    
-    return render(request, 'activity_tracker/dashboard.html', context)
 
+    response = await arender(request, 'activity_tracker/dashboard.html', context)
+    if timings:
+        response['Server-Timing'] = server_timing(timings)
+    return response
+
+
+async def _period_dashboard(request, period, activities):
+    """
+    Render the day/week/month dashboard: the period's by-type chart builds
+    on the chart pool while ``activities`` and the type totals load.
+    """
+    user = await request.auser()
+    pending = await sync_to_async(submit_charts)({
+        'activities_by_type': partial(
+            get_or_build_chart, user, 'activities_by_type',
+            partial(create_activities_by_type_chart, user, period),
+            period=period,
+        ),
+    })
+    activities, activity_tag_stats = await asyncio.gather(
+        activities(user),
+        alist(period_type_totals(user, period)),
+    )
+    charts, timings = await acollect_charts(
+        pending, {'activities_by_type': _activities_by_type_placeholder(period)})
 
-@login_required
-def dashboard_day_view(request):
-    today = timezone.now().date()
-    today_activities = Activity.objects.filter(
-        user=request.user, 
-        start_time__date=today
-    ).order_by('-start_time')
-    
-    activity_tag_stats = Activity.objects.filter(
-        user=request.user, 
-        start_time__date=today
-    ).values('activity_type') \
-     .annotate(
-         total_duration=Sum('duration'),
-         activity_count=Count('id')
-     )
-     
-    chart_day = create_activities_by_type_chart(request.user, 'day')
     context = {
-        'today_activities': today_activities,
         'activity_tag_stats': activity_tag_stats,
-        'day_activities_by_type_chart': chart_day,
+        f'{period}_activities_by_type_chart': charts['activities_by_type'],
         **get_dashboard_forms(),
-     }
-    
-    return render(request, 'activity_tracker/dashboard_day.html', context)
-    
-    
+    }
+    if isinstance(activities, Page):
+        context['today_activities'] = activities.items
+        context['next_activities_url'] = _next_activities_url(period, activities)
+    else:
+        context['today_activities'] = activities
+
+    response = await arender(request, f'activity_tracker/dashboard_{period}.html', context)
+    response['Server-Timing'] = server_timing(timings)
+    return response
+
+
 @login_required
-def dashboard_week_view(request):
-    today = timezone.now().date()
-    this_week = today - timezone.timedelta(days=today.weekday())
-    today_activities = Activity.objects.filter(
-        user=request.user, 
-        start_time__date__gte=this_week
-    ).order_by('-start_time')
-    
-    activity_tag_stats = Activity.objects.filter(
-        user=request.user, 
-        start_time__date__gte=this_week
-    ).values('activity_type') \
-     .annotate(
-         total_duration=Sum('duration'),
-         activity_count=Count('id')
-     )
-    chart_week = create_activities_by_type_chart(request.user, 'week')
-    context = {
-        'today_activities': today_activities,
-        'activity_tag_stats': activity_tag_stats,
-        'week_activities_by_type_chart': chart_week,
-        **get_dashboard_forms(),
-     }
-    
-    return render(request, 'activity_tracker/dashboard_week.html', context)
+@use_replica
+async def dashboard_day_view(request):
+    return await _period_dashboard(request, 'day', lambda user: alist(today_activities(user)))
 
 
 @login_required
-def dashboard_month_view(request):
-    this_month = timezone.now().replace(day=1).date()
-    today = timezone.now().date()
-    today_activities = Activity.objects.filter(
-        user=request.user, 
-        start_time__date__gte=this_month
-    ).order_by('-start_time')
-    
-    activity_tag_stats = Activity.objects.filter(
-        user=request.user, 
-        start_time__date__gte=this_month
-    ).values('activity_type') \
-     .annotate(
-         total_duration=Sum('duration'),
-         activity_count=Count('id')
-     )
-    
-    chart_month = create_activities_by_type_chart(request.user, 'month')
-    context = {
-        'today_activities': today_activities,
-        'activity_tag_stats': activity_tag_stats,
-        'month_activities_by_type_chart': chart_month,
-        **get_dashboard_forms(),
-     }
-    
-    return render(request, 'activity_tracker/dashboard_month.html', context)
+@use_replica
+async def dashboard_week_view(request):
+    return await _period_dashboard(request, 'week', partial(aactivity_list_page, period='week'))
+
+
+@login_required
+@use_replica
+async def dashboard_month_view(request):
+    return await _period_dashboard(request, 'month', partial(aactivity_list_page, period='month'))
+
+
+def _next_activities_url(period, page):
+    if not page.has_next:
+        return None
+    return reverse('activity_list') + '?' + urlencode({'period': period, 'cursor': page.next_cursor})
+
+
+@login_required
+@use_replica
+async def activity_list_view(request):
+    """Next page of a week/month activity table, for infinite scroll."""
+    period = request.GET.get('period', 'week')
+    if period not in PERIODS:
+        return HttpResponseBadRequest("Unknown period")
+    try:
+        page = await aactivity_list_page(await request.auser(), period, request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    return JsonResponse({
+        'html': await sync_to_async(render_to_string)(
+            'activity_tracker/activity_rows.html', {'activities': page.items}),
+        'next': _next_activities_url(period, page),
+    })
+
 
 @login_required
+@use_replica
 def expenses_view(request):
-    # Placeholder for expenses view
+    form = ExpenseFilterForm(request.GET)
     context = {
-        'title': 'Expenses',
-        'welcome_message': 'Track and Manage Your Expenses',
-        }
+        'filter_form': form,
+        **get_dashboard_forms(),
+    }
+    if form.is_valid():
+        filters = dict(form.cleaned_data)
+        sort = filters.pop('sort')
+        expenses = filter_expenses(request.user, **filters)
+        try:
+            page = expense_page(expenses, sort, request.GET.get('cursor'))
+        except InvalidCursor:
+            return HttpResponseBadRequest("Invalid cursor")
+        query = request.GET.copy()
+        query.pop('cursor', None)
+        context.update({
+            'expenses': page.items,
+            'totals': expense_totals(expenses),
+            'first_page_url': '?' + query.urlencode() if 'cursor' in request.GET else None,
+        })
+        if page.has_next:
+            query['cursor'] = page.next_cursor
+            context['next_page_url'] = '?' + query.urlencode()
     return render(request, 'activity_tracker/expenses.html', context)
-    
-    
-     
-    
-    
\ No newline at end of file
+
+
+def _export(request, model, rows, fields, name):
+    form = ExportForm(request.GET, tags=model.TAGS)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    filters = form.cleaned_data
+    rows = rows(request.user, filters['start'], filters['end'], filters['type'])
+    fmt = filters['format']
+    filename = f'{name}.{fmt}'
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if filters['gzip']:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    # Over ASGI a sync iterator would be read whole before the first byte
+    stream = astream_export if isinstance(request, ASGIRequest) else stream_export
+    response = StreamingHttpResponse(
+        stream(rows, fields, fmt, compress=filters['gzip']),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@use_replica
+def export_activities_view(request):
+    return _export(request, Activity, activity_rows, ACTIVITY_FIELDS, 'activities')
+
+
+@login_required
+@use_replica
+def export_expenses_view(request):
+    return _export(request, Expense, expense_rows, EXPENSE_FIELDS, 'expenses')
+
+
+CHART_FIGURES = {
+    'daily-activities': lambda user, period: daily_activities_figure(user),
+    'activities-by-type': activities_by_type_figure,
+    'expenses-by-category': lambda user, period: expenses_tree_figure(user),
+}
+
+
+def chart_etag(user, kind, period):
+    # Figures only change with the user's data (and, for period charts, the day)
+    return f'"{kind}:{period}:{timezone.localdate()}:{get_data_version(user.pk)}"'
+
+
+# Not routed to a replica: browsers keep the figure under an ETag of the
+# current data version, so it must not be built from a lagging copy
+@login_required
+@cache_control(private=True, no_cache=True)
+async def chart_data_view(request, kind):
+    if kind not in CHART_FIGURES:
+        raise Http404("Unknown chart")
+    period = request.GET.get('period', 'year')
+    if period not in PERIODS:
+        return HttpResponseBadRequest("Unknown period")
+    user = await request.auser()
+    # What @condition does, with the cache lookup off the event loop
+    etag = await sync_to_async(chart_etag)(user, kind, period)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        fig = await sync_to_async(CHART_FIGURES[kind])(user, period)
+        response = HttpResponse(fig.to_json(), content_type='application/json')
+    response.headers.setdefault('ETag', etag)
+    return response
+
+
+@staff_member_required
+def chart_cache_stats_view(request):
+    return JsonResponse(chart_cache_stats())
+
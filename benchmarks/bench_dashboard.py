@@ -0,0 +1,101 @@
+"""
+Timings of the dashboard pages, the utils aggregations and chart builders,
+and the add_activity POST, once per BENCHMARK_YEARS data size.
+"""
+import os
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from activity_tracker import utils
+from activity_tracker.chart_cache import invalidate_user_charts
+
+pytestmark = pytest.mark.django_db
+
+ROUNDS = int(os.environ.get('BENCHMARK_ROUNDS', 10))
+
+PAGES = [
+    ('dashboard', {}),
+    ('dashboard', {'period': 'month'}),
+    ('dashboard_day', {}),
+    ('dashboard_week', {}),
+    ('dashboard_month', {}),
+    ('activity_list', {'period': 'month'}),
+    ('expenses', {}),
+    ('expenses', {'sort': '-amount', 'category': 'food'}),
+]
+
+CHART_DATA = ['daily-activities', 'activities-by-type', 'expenses-by-category']
+
+AGGREGATIONS = {
+    'aggregate_daily_activities': lambda user: list(utils.aggregate_daily_activities(user)),
+    **{
+        f'agg_activities_by_type_{period}': lambda user, period=period: list(
+            utils.agg_activities_by_type(user, period))
+        for period in utils.PERIODS
+    },
+    'agg_expenses_by_category': lambda user: list(utils.agg_expenses_by_category(user)),
+}
+
+CHARTS = {
+    'create_daily_activities_chart': utils.create_daily_activities_chart,
+    **{
+        f'create_activities_by_type_chart_{period}': lambda user, period=period: (
+            utils.create_activities_by_type_chart(user, period))
+        for period in utils.PERIODS
+    },
+    'create_expenses_tree_chart': utils.create_expenses_tree_chart,
+}
+
+
+@pytest.mark.benchmark(group='pages')
+@pytest.mark.parametrize('name, params', PAGES, ids=[
+    '-'.join([name, *params.values()]) for name, params in PAGES
+])
+def bench_page(benchmark, logged_in_client, seeded_user, name, params):
+    # Cold chart cache, as on the first visit after the user's data changed
+    response = benchmark.pedantic(
+        lambda: logged_in_client.get(reverse(name), params),
+        setup=lambda: invalidate_user_charts(seeded_user.pk),
+        rounds=ROUNDS,
+        warmup_rounds=1,
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group='pages')
+def bench_dashboard_cached_charts(benchmark, logged_in_client):
+    logged_in_client.get(reverse('dashboard'))
+    response = benchmark(logged_in_client.get, reverse('dashboard'))
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group='chart-data')
+@pytest.mark.parametrize('kind', CHART_DATA)
+def bench_chart_data(benchmark, logged_in_client, kind):
+    response = benchmark(logged_in_client.get, reverse('chart_data', args=[kind]))
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group='aggregations')
+@pytest.mark.parametrize('name', AGGREGATIONS)
+def bench_aggregation(benchmark, seeded_user, name):
+    assert benchmark(AGGREGATIONS[name], seeded_user) is not None
+
+
+@pytest.mark.benchmark(group='charts')
+@pytest.mark.parametrize('name', CHARTS)
+def bench_chart(benchmark, seeded_user, name):
+    assert benchmark(CHARTS[name], seeded_user).startswith('<div')
+
+
+@pytest.mark.benchmark(group='writes')
+def bench_add_activity(benchmark, logged_in_client):
+    data = {
+        'name': 'Benchmark',
+        'activity_type': 'other',
+        'start_time': timezone.localtime().strftime('%Y-%m-%dT%H:%M'),
+    }
+    response = benchmark(logged_in_client.post, reverse('add_activity'), data)
+    assert response.status_code == 302
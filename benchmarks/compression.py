@@ -0,0 +1,82 @@
+"""
+Bytes on the wire and CPU cost of compressing the home page, the dashboard
+and a chart JSON response at several gzip levels and Brotli qualities.
+
+Renders the pages once through Django's test client, as a seeded user,
+against the database configured in .env, then compresses each body with
+the same functions CompressionMiddleware uses:
+
+    python manage.py seed_load --users 1 --years 1 --seed 1
+    python benchmarks/compression.py --username load0
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+GZIP_LEVELS = (1, 4, 6, 9)
+BROTLI_QUALITIES = (1, 4, 5, 8, 11)
+
+
+def render_pages(username):
+    import django
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    setup_test_environment()
+    client = Client()
+    client.force_login(get_user_model().objects.get(username=username))
+    paths = {
+        'home': reverse('home'),
+        'dashboard': reverse('dashboard'),
+        'chart json': reverse('chart_data', args=['daily-activities']),
+    }
+    pages = {}
+    for name, path in paths.items():
+        client.get(path)  # warm the chart cache
+        pages[name] = client.get(path).content
+    return pages
+
+
+def cpu_ms(compress, body, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.process_time()
+        compress(body)
+        times.append(time.process_time() - started)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--username', default='load0')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'activity_tracker.settings')
+    pages = render_pages(args.username)
+    from activity_tracker.compression import brotli_compress, gzip_compress
+
+    codecs = [(f'gzip {level}', lambda body, level=level: gzip_compress(body, level, 100))
+              for level in GZIP_LEVELS]
+    codecs += [(f'br {quality}', lambda body, quality=quality: brotli_compress(body, quality))
+               for quality in BROTLI_QUALITIES]
+
+    print(f"{'page':<12}{'codec':<10}{'bytes':>12}{'ratio':>8}{'cpu ms':>10}")
+    for name, body in pages.items():
+        print(f"{name:<12}{'identity':<10}{len(body):>12}{1:>8.2f}{0:>10.2f}")
+        for codec, compress in codecs:
+            size = len(compress(body))
+            print(f"{name:<12}{codec:<10}{size:>12}{len(body) / size:>8.2f}"
+                  f"{cpu_ms(compress, body, args.repeat):>10.2f}")
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, str(BASE_DIR))
+    main()
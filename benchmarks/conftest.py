@@ -0,0 +1,24 @@
+import io
+import os
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+# Years of history per user for each data size, e.g. BENCHMARK_YEARS=1,3,5
+YEARS = [float(years) for years in os.environ.get('BENCHMARK_YEARS', '1,3').split(',')]
+
+
+@pytest.fixture(scope='session', params=YEARS, ids=lambda years: f'{years:g}y')
+def seeded_user(request, django_db_setup, django_db_blocker):
+    """First of three users seeded with ``seed_load``; tests roll back their own writes."""
+    prefix = f'bench{request.param:g}y-'
+    with django_db_blocker.unblock():
+        call_command('seed_load', users=3, years=request.param, prefix=prefix, seed=1, stdout=io.StringIO())
+        return get_user_model().objects.get(username=f'{prefix}0')
+
+
+@pytest.fixture
+def logged_in_client(client, seeded_user):
+    client.force_login(seeded_user)
+    return client
@@ -0,0 +1,104 @@
+"""
+Connection setup overhead of the dashboard and add_activity paths for each
+DB_CONN_MODE.
+
+Runs requests through Django's test client against the database configured
+in .env (migrated, and reachable), one subprocess per mode so each picks up
+its own settings:
+
+    python benchmarks/connection_overhead.py --requests 200
+
+The test client skips Django's per-request connection cleanup, so the
+benchmark calls close_old_connections() around each request the way the
+request_started/request_finished handlers do under a real server worker.
+In pool mode the connection count is pool checkouts, not new backends.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODES = ('none', 'persistent', 'pool')
+USERNAME = 'benchmark-connections'
+
+
+def run_mode(requests):
+    import django
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.db import close_old_connections
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from django.utils import timezone
+
+    setup_test_environment()
+    opened = []
+    connection_created.connect(
+        lambda sender, connection, **kwargs: opened.append(connection.alias), weak=False,
+    )
+
+    User = get_user_model()
+    User.objects.filter(username=USERNAME).delete()
+    user = User.objects.create_user(username=USERNAME)
+    client = Client()
+    client.force_login(user)
+    paths = {
+        'dashboard': lambda: client.get(reverse('dashboard')),
+        'add_activity': lambda: client.post(reverse('add_activity'), {
+            'name': 'Benchmark',
+            'activity_type': 'other',
+            'start_time': timezone.now().strftime('%Y-%m-%d %H:%M'),
+        }),
+    }
+    results = {}
+    try:
+        for name, request in paths.items():
+            request()  # warm up caches and the first connection
+            opened.clear()
+            start = time.perf_counter()
+            for _ in range(requests):
+                close_old_connections()
+                request()
+                close_old_connections()
+            elapsed = time.perf_counter() - start
+            results[name] = {
+                'mean_ms': elapsed / requests * 1000,
+                'connections_opened': len(opened),
+            }
+    finally:
+        User.objects.filter(username=USERNAME).delete()
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        return run_mode(args.requests)
+
+    print(f"{'mode':<12}{'path':<14}{'mean ms':>10}{'connections':>14}")
+    for mode in MODES:
+        env = {
+            'DJANGO_SETTINGS_MODULE': 'activity_tracker.settings',
+            **os.environ,
+            'DB_CONN_MODE': mode,
+        }
+        output = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, '--requests', str(args.requests)],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        for path, result in json.loads(output.splitlines()[-1]).items():
+            print(f"{mode:<12}{path:<14}{result['mean_ms']:>10.2f}{result['connections_opened']:>14}")
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, str(BASE_DIR))
+    main()
@@ -0,0 +1,129 @@
+"""
+Closed-loop HTTP load test of a running server: each of --concurrency
+clients signs in, then requests one page back to back over a keep-alive
+connection for --duration seconds. Reports requests/sec and latency
+percentiles per path.
+
+Start the server (e.g. ``docker compose up``), give a seeded user a
+password, then:
+
+    python manage.py changepassword load0
+    python benchmarks/load_test.py --url http://localhost:8000 \\
+        --username load0 --password ... --concurrency 16 --duration 30
+
+Only the standard library is used, so it runs from any machine that can
+reach the server.
+"""
+import argparse
+import http.client
+import re
+import statistics
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_PATHS = ('/home/', '/dashboard/')
+
+
+class Session:
+    """One keep-alive connection with its own cookies."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=60)
+        self.host = parts.netloc
+        self.cookies = {}
+
+    def request(self, method, path, body=None, headers=None):
+        headers = {'Host': self.host, **(headers or {})}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        except (ConnectionError, http.client.HTTPException):
+            # The server closed the idle connection (e.g. a worker restart)
+            self.connection.close()
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        content = response.read()
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status, content
+
+    def login(self, username, password):
+        status, content = self.request('GET', '/login/')
+        token = re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', content).group(1).decode()
+        status, _ = self.request(
+            'POST', '/login/',
+            urlencode({'username': username, 'password': password, 'csrfmiddlewaretoken': token}),
+            {'Content-Type': 'application/x-www-form-urlencoded', 'Referer': f'http://{self.host}/login/'},
+        )
+        if status != 302:
+            raise SystemExit(f"Login as {username} failed (status {status})")
+
+
+def run_client(session, path, stop_at, latencies, errors):
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            status, _ = session.request('GET', path)
+        except OSError:
+            status = None
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors.append(status)
+
+
+def load_path(sessions, path, duration):
+    for session in sessions:
+        session.request('GET', path)  # warm up caches and connections
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=run_client, args=(session, path, stop_at, latencies, errors))
+        for session in sessions
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentiles[49] * 1000,
+        'p95_ms': percentiles[94] * 1000,
+        'p99_ms': percentiles[98] * 1000,
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help="Seconds per path.")
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+    args = parser.parse_args()
+
+    sessions = [Session(args.url) for _ in range(args.concurrency)]
+    for session in sessions:
+        session.login(args.username, args.password)
+
+    print(f"{'path':<16}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for path in args.paths:
+        result = load_path(sessions, path, args.duration)
+        print(f"{path:<16}{result['requests']:>10}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Gunicorn settings for serving ``activity_tracker.asgi`` with uvicorn
+workers. Each worker runs an event loop, so one process keeps many
+dashboard requests in flight while they wait on PostgreSQL.
+"""
+import math
+import os
+
+
+def available_cpus():
+    """
+    CPUs this process may use: its affinity mask (docker --cpuset-cpus),
+    capped by a cgroup v2 CPU quota (docker --cpus). cpu_count() sees
+    every CPU of the host.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+cpus = available_cpus()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+# An event loop worker per CPU keeps every core busy. Blocking workers need
+# about 2 x CPUs + 1 requests in flight: as processes for sync, as threads
+# of a process per CPU for gthread
+if 'uvicorn' in worker_class or worker_class == 'gthread':
+    default_workers = cpus
+else:
+    default_workers = cpus * 2 + 1
+workers = int(os.environ.get('WEB_CONCURRENCY', default_workers))
+# Only used by the gthread worker class
+threads = int(os.environ.get('GUNICORN_THREADS', cpus * 2 + 1))
+
+# Import Django, plotly and the templates once in the master so forked
+# workers share those pages copy-on-write and start instantly
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+# Restart each worker after this many requests (plus jitter, so they don't
+# all restart at once) to cap slow memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+
+
+def on_starting(server):
+    # Chart data versions, cached charts and time zones are invalidated in
+    # the cache of the worker that handled the write; with a per-process
+    # cache the other workers would keep serving stale pages
+    if server.cfg.workers < 2:
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'activity_tracker.settings')
+    from django.conf import settings
+    for alias in {'default', settings.CHART_CACHE_ALIAS}:
+        if settings.CACHES[alias]['BACKEND'].endswith('.LocMemCache'):
+            raise RuntimeError(
+                f"The {alias!r} cache is local to each process, but {server.cfg.workers} workers "
+                f"are configured. Set CACHE_URL to a shared cache (e.g. rediscache://redis:6379/1) "
+                f"or run a single worker with WEB_CONCURRENCY=1."
+            )
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # The chart helpers import plotly lazily; load it in the master so every
+    # worker, including ones restarted by max_requests, starts with it
+    from activity_tracker.utils import warm_up_charting
+    warm_up_charting()
+
+    # Preloading may have connected to the database (e.g. WARM_DEMO_CHARTS);
+    # connections and psycopg pools must not be inherited by forked workers
+    from django.db import connections
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if connection.alias in getattr(connection, '_connection_pools', {}):
+            connection.close_pool()
@@ -0,0 +1,43 @@
+// Infinite scroll for activity tables: when the end of a table whose body
+// has a data-next-url comes into view, append the next keyset page.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('tbody[data-next-url]').forEach(function (body) {
+        const sentinel = document.createElement('div');
+        body.closest('table').after(sentinel);
+        let loading = false;
+
+        const observer = new IntersectionObserver(function (entries) {
+            if (!entries[0].isIntersecting || loading || !body.dataset.nextUrl) {
+                return;
+            }
+            loading = true;
+            fetch(body.dataset.nextUrl, { headers: { 'Accept': 'application/json' } })
+                .then(function (response) {
+                    if (!response.ok) {
+                        throw new Error(response.statusText);
+                    }
+                    return response.json();
+                })
+                .then(function (page) {
+                    body.insertAdjacentHTML('beforeend', page.html);
+                    if (page.next) {
+                        body.dataset.nextUrl = page.next;
+                        // Re-observe so a sentinel that is still visible
+                        // triggers the following page too
+                        observer.unobserve(sentinel);
+                        observer.observe(sentinel);
+                    } else {
+                        delete body.dataset.nextUrl;
+                        observer.disconnect();
+                    }
+                })
+                .catch(function () {
+                    observer.disconnect();
+                })
+                .finally(function () {
+                    loading = false;
+                });
+        });
+        observer.observe(sentinel);
+    });
+});
@@ -0,0 +1,20 @@
+// Fill every chart placeholder from its JSON endpoint. All charts are
+// requested in parallel; unchanged charts come back as 304s from the
+// browser cache.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.chart-placeholder[data-chart-url]').forEach(function (container) {
+        fetch(container.dataset.chartUrl, { headers: { 'Accept': 'application/json' } })
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.json();
+            })
+            .then(function (figure) {
+                Plotly.newPlot(container, figure.data, figure.layout, { responsive: true });
+            })
+            .catch(function () {
+                container.textContent = 'Chart could not be loaded.';
+            });
+    });
+});